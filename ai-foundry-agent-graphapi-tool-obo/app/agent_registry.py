@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock, RLock
+from typing import Any, Dict, List, Tuple
+from azure.identity import DefaultAzureCredential
+from azure.ai.agents import AgentsClient
+
+AGENT_SESSION_IDLE_TIMEOUT = float(os.getenv("AGENT_SESSION_IDLE_TIMEOUT", 1800))  # saniye
+AGENT_SESSION_MAX = int(os.getenv("AGENT_SESSION_MAX", 1000))
+
+
+class AgentRegistry:
+    """
+    Shared Azure AI Agents resources.
+    - one credential + AgentsClient per endpoint (credential discovery happens once)
+    - one agent definition per (endpoint, model); an existing agent with the same
+      name and definition hash is reused instead of registering a new one
+    - one thread per (endpoint, session) so follow-up prompts continue the conversation
+    - end_session() deletes the session's threads (called on logout)
+    - sessions idle for session_idle_timeout, or the least recently used ones beyond
+      max_sessions, are ended the same way; a session with a running request is kept
+    """
+    def __init__(self, name: str, instructions: str, tools: List[Dict[str, Any]], description: str = "",
+                 session_idle_timeout: float = AGENT_SESSION_IDLE_TIMEOUT, max_sessions: int = AGENT_SESSION_MAX):
+        self.name = name
+        self.instructions = instructions
+        self.tools = tools
+        self.description = description
+        self._clients: Dict[str, Any] = {}                  # endpoint -> (credential, client)
+        self._agents: Dict[Tuple[str, str], str] = {}       # (endpoint, model) -> agent id
+        self._threads: Dict[Tuple[str, str], str] = {}      # (endpoint, session) -> thread id
+        self._session_locks: Dict[str, Lock] = {}
+        self._last_used: "OrderedDict[str, float]" = OrderedDict()  # session -> son kullanım (LRU sırası)
+        self.session_idle_timeout = session_idle_timeout
+        self.max_sessions = max(1, max_sessions)
+        self._lock = RLock()
+        self._agent_lock = Lock()
+        self._evicted = 0
+
+    def _definition_hash(self, model: str) -> str:
+        definition = json.dumps([model, self.instructions, self.tools, self.description], sort_keys=True)
+        return hashlib.sha256(definition.encode()).hexdigest()[:32]
+
+    def get_client(self, endpoint: str):
+        with self._lock:
+            entry = self._clients.get(endpoint)
+            if entry is None:
+                credential = DefaultAzureCredential()
+                entry = (credential, AgentsClient(endpoint=endpoint, credential=credential))
+                self._clients[endpoint] = entry
+            return entry[1]
+
+    def get_agent_id(self, endpoint: str, model: str) -> str:
+        key = (endpoint, model)
+        with self._lock:
+            agent_id = self._agents.get(key)
+        if agent_id:
+            return agent_id
+        # Aynı anda gelen ilk istekler tek bir agent oluştursun
+        with self._agent_lock:
+            with self._lock:
+                agent_id = self._agents.get(key)
+            if agent_id:
+                return agent_id
+            client = self.get_client(endpoint)
+            definition_hash = self._definition_hash(model)
+            for agent in client.list_agents():
+                if agent.name == self.name and (agent.metadata or {}).get("definition_hash") == definition_hash:
+                    agent_id = agent.id
+                    break
+            else:
+                agent_id = client.create_agent(
+                    model=model,
+                    name=self.name,
+                    instructions=self.instructions,
+                    tools=self.tools,
+                    description=self.description,
+                    metadata={"definition_hash": definition_hash},
+                ).id
+            with self._lock:
+                self._agents[key] = agent_id
+            return agent_id
+
+    def get_thread_id(self, endpoint: str, session_id: str) -> str:
+        key = (endpoint, session_id)
+        with self._lock:
+            thread_id = self._threads.get(key)
+        if thread_id:
+            return thread_id
+        thread_id = self.get_client(endpoint).threads.create().id
+        with self._lock:
+            # Aynı oturum için paralel oluşturulduysa ilk kaydedilen kullanılır
+            return self._threads.setdefault(key, thread_id)
+
+    @contextmanager
+    def session(self, session_id: str):
+        """Bir thread üzerinde aynı anda tek run çalışabilir; oturumun istekleri sırayla işlenir."""
+        with self._lock:
+            lock = self._session_locks.setdefault(session_id, Lock())
+            self._touch(session_id)
+            threads = self._evict_sessions(session_id)
+        self._delete_threads(threads)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                if session_id in self._last_used:
+                    self._touch(session_id)
+
+    def _touch(self, session_id: str):
+        self._last_used[session_id] = time.monotonic()
+        self._last_used.move_to_end(session_id)
+
+    def _pop_session(self, session_id: str) -> List[Tuple[str, str]]:
+        keys = [key for key in self._threads if key[1] == session_id]
+        self._session_locks.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        return [(key[0], self._threads.pop(key)) for key in keys]
+
+    def _evict_sessions(self, current: str) -> List[Tuple[str, str]]:
+        # Boşta kalan ve (LRU) fazla oturumlar bırakılır; o an run çalıştıran oturum bırakılmaz
+        now = time.monotonic()
+        threads = []
+        for session_id, last_used in list(self._last_used.items()):
+            excess = len(self._last_used) > self.max_sessions
+            if not excess and now - last_used <= self.session_idle_timeout:
+                break
+            lock = self._session_locks.get(session_id)
+            if session_id == current or (lock is not None and lock.locked()):
+                continue
+            threads.extend(self._pop_session(session_id))
+            self._evicted += 1
+        return threads
+
+    def _delete_threads(self, threads: List[Tuple[str, str]]):
+        for endpoint, thread_id in threads:
+            try:
+                self.get_client(endpoint).threads.delete(thread_id)
+            except Exception as e:
+                print(f"Thread cleanup failed for {thread_id}: {e}")
+
+    def end_session(self, session_id: str):
+        with self._lock:
+            threads = self._pop_session(session_id)
+        self._delete_threads(threads)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "agents": len(self._agents),
+                "threads": len(self._threads),
+                "sessions": len(self._last_used),
+                "evicted_sessions": self._evicted,
+            }
@@ -1,6 +1,5 @@
-import time, json
-from azure.identity import DefaultAzureCredential
-from azure.ai.agents import AgentsClient
+import os, time, json
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from azure.ai.agents.models import (
     RequiredFunctionToolCall,
     SubmitToolOutputsAction,
@@ -8,52 +7,137 @@ from azure.ai.agents.models import (
     ListSortOrder
 )
 from .graph_tools import graph_api_tools, execute_tool_call
+from .graph_batch import GraphBatch
+from .agent_registry import AgentRegistry
+
+# Run durumu önce sık, sonra giderek seyrek sorgulanır; her durum değişikliğinde aralık sıfırlanır
+RUN_POLL_INITIAL = float(os.getenv("RUN_POLL_INITIAL", 0.1))  # saniye
+RUN_POLL_MAX = float(os.getenv("RUN_POLL_MAX", 1.0))  # saniye
+RUN_POLL_BACKOFF = 1.5
+RUN_DEADLINE = float(os.getenv("RUN_DEADLINE", 120))  # saniye, run başına toplam süre
+ACTIVE_RUN_STATUSES = ("queued", "in_progress", "requires_action")
+# Aynı adımdaki tool çağrıları paralel çalışır; havuz tüm istekler arasında paylaşılır
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", 8))
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", 30))  # saniye, tool çağrısı başına
+
+tool_pool = ThreadPoolExecutor(max_workers=max(1, TOOL_WORKERS), thread_name_prefix="agent-tool")
+
+AGENT_NAME = "delegated-graph-agent"
+AGENT_INSTRUCTIONS = (
+    "You can  call functions to fetch user info from Microsoft Graph. Then you use that info to answer the user's question. Your output should be human-friendly. "
+    "Never request the raw token. If a function returns an error, explain it clearly."
+)
+AGENT_DESCRIPTION = "Agent  using delegated Graph permissions securely."
+
+# Credential/istemci endpoint başına, agent tanımı model başına bir kez oluşturulur; thread'ler oturum başına tutulur
+agent_registry = AgentRegistry(
+    name=AGENT_NAME,
+    instructions=AGENT_INSTRUCTIONS,
+    tools=graph_api_tools,
+    description=AGENT_DESCRIPTION
+)
 
 def get_agents_client(endpoint: str):
-    credential = DefaultAzureCredential()
-    return AgentsClient(endpoint=endpoint, credential=credential)
+    return agent_registry.get_client(endpoint)
+
+def end_session(session_id: str):
+    agent_registry.end_session(session_id)
+
+def _tool_error(message: str) -> str:
+    return json.dumps({"error": message})
+
+def _execute_in_batch(batch, tool_call, session_id: str) -> str:
+    if batch is None:
+        return execute_tool_call(tool_call, session_id)
+    with batch.participant():
+        return execute_tool_call(tool_call, session_id)
+
+def execute_tool_calls(tool_calls, session_id: str, deadline: float = None) -> list:
+    """
+    Runs the function calls of one requires_action step concurrently.
+    Every call gets TOOL_TIMEOUT (and never more than the run deadline); a call
+    that fails or times out becomes an error output without affecting the others.
+    Graph requests of the calls are combined into $batch calls (see GraphBatch).
+    Outputs keep the order of tool_calls.
+    """
+    calls = [tc for tc in tool_calls if isinstance(tc, RequiredFunctionToolCall)]
+    submitted_at = time.monotonic()
+    tool_deadline = submitted_at + TOOL_TIMEOUT
+    if deadline is not None:
+        tool_deadline = min(tool_deadline, deadline)
+    # Birden çok çağrı varsa Graph istekleri tek bir $batch'te toplanır
+    batch = GraphBatch(session_id, participants=len(calls)) if len(calls) > 1 else None
+    futures = [(tc, tool_pool.submit(_execute_in_batch, batch, tc, session_id)) for tc in calls]
+
+    outputs = []
+    for tc, future in futures:
+        try:
+            output = future.result(timeout=max(0.0, tool_deadline - time.monotonic()))
+        except FutureTimeoutError:
+            # Başlamamışsa hiç çalışmaz; çalışan çağrı arka planda HTTP timeout'u ile biter
+            future.cancel()
+            output = _tool_error(f"Tool {tc.function.name} timed out after {tool_deadline - submitted_at:.1f} seconds")
+        except Exception as e:
+            output = _tool_error(str(e))
+        outputs.append(ToolOutput(tool_call_id=tc.id, output=output))
+    return outputs
+
+def wait_for_run(client, thread_id: str, run, session_id: str, deadline: float):
+    """
+    Polls the run until it leaves the active states. The interval starts at
+    RUN_POLL_INITIAL and backs off to RUN_POLL_MAX; tool calls are executed as
+    soon as requires_action is seen. Returns None if the deadline passes.
+    """
+    interval = RUN_POLL_INITIAL
+    last_status = run.status
+    while run.status in ACTIVE_RUN_STATUSES:
+        if run.status == "requires_action" and isinstance(run.required_action, SubmitToolOutputsAction):
+            outputs = execute_tool_calls(run.required_action.submit_tool_outputs.tool_calls, session_id, deadline)
+            # submit_tool_outputs güncel run'ı döndürür; beklemeden devam edilir
+            run = client.runs.submit_tool_outputs(thread_id=thread_id, run_id=run.id, tool_outputs=outputs)
+            interval = RUN_POLL_INITIAL
+            last_status = run.status
+            continue
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(interval, remaining))
+        run = client.runs.get(thread_id=thread_id, run_id=run.id)
+        if run.status != last_status:
+            interval = RUN_POLL_INITIAL
+            last_status = run.status
+        else:
+            interval = min(interval * RUN_POLL_BACKOFF, RUN_POLL_MAX)
+    return run
 
 def run_agent(session_id: str, prompt: str, endpoint: str, model: str = "gpt-4.1") -> dict:
     client = get_agents_client(endpoint)
-    agent = client.create_agent(
-        model=model,
-        name="delegated-graph-agent",
-        instructions=(
-            "You can  call functions to fetch user info from Microsoft Graph. Then you use that info to answer the user's question. Your output should be human-friendly. "
-            "Never request the raw token. If a function returns an error, explain it clearly."
-        ),
-        tools=graph_api_tools,
-        description="Agent  using delegated Graph permissions securely."
-    )
-
-    thread = client.threads.create()
-    client.messages.create(thread_id=thread.id, role="user", content=prompt)
-    run = client.runs.create(thread_id=thread.id, agent_id=agent.id)
-
-    while run.status in ["queued", "in_progress", "requires_action"]:
-        time.sleep(1)
-        run = client.runs.get(thread_id=thread.id, run_id=run.id)
-        if run.status == "requires_action" and isinstance(run.required_action, SubmitToolOutputsAction):
-            tool_calls = run.required_action.submit_tool_outputs.tool_calls
-            outputs = []
-            for tc in tool_calls:
-                if isinstance(tc, RequiredFunctionToolCall):
-                    try:
-                        output = execute_tool_call(tc, session_id)
-                    except Exception as e:
-                        output = json.dumps({"error": str(e)})
-                    outputs.append(ToolOutput(tool_call_id=tc.id, output=output))
-            if outputs:
-                client.runs.submit_tool_outputs(thread_id=thread.id, run_id=run.id, tool_outputs=outputs)
-
-    # Collect messages
-    msgs = client.messages.list(thread_id=thread.id, order=ListSortOrder.ASCENDING)
-    assistant_response = ""
-    for m in msgs:
-        if m.text_messages and m.role == "assistant":
-            assistant_response = m.text_messages[-1].text.value
+    agent_id = agent_registry.get_agent_id(endpoint, model)
+
+    with agent_registry.session(session_id):
+        thread_id = agent_registry.get_thread_id(endpoint, session_id)
+        deadline = time.monotonic() + RUN_DEADLINE
+        client.messages.create(thread_id=thread_id, role="user", content=prompt)
+        run = client.runs.create(thread_id=thread_id, agent_id=agent_id)
+        run_id = run.id
+
+        run = wait_for_run(client, thread_id, run, session_id, deadline)
+        if run is None:
+            # Thread'de aktif run kalırsa oturumun sonraki istekleri bloklanır
+            try:
+                client.runs.cancel(thread_id=thread_id, run_id=run_id)
+            except Exception as e:
+                print(f"Run cancel failed for {run_id}: {e}")
+            return {"error": f"Agent run did not finish within {RUN_DEADLINE:g} seconds"}
+
+        # Thread önceki turları da içerir; yalnızca bu run'ın asistan yanıtı alınır
+        msgs = client.messages.list(thread_id=thread_id, order=ListSortOrder.ASCENDING)
+        assistant_response = ""
+        for m in msgs:
+            if m.text_messages and m.role == "assistant" and m.run_id == run.id:
+                assistant_response = m.text_messages[-1].text.value
     
     # Return only the assistant's response text
     return {
         "response": assistant_response
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,210 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from threading import Condition, local
+from typing import Dict, List, Optional
+from .graph_client import graph_client, RETRY_STATUSES
+from .graph_cache import graph_cache, GraphResponse
+
+GRAPH_BATCH_MAX_REQUESTS = 20  # Graph JSON batching limit per $batch call
+GRAPH_BATCH_WINDOW = float(os.getenv("GRAPH_BATCH_WINDOW", 0.05))  # seconds, max wait for other tool calls
+
+_current = local()
+
+
+def _failed_dependency(url: str) -> GraphResponse:
+    return GraphResponse(424, None, json.dumps({"error": "Dependency failed", "dependency": url}))
+
+
+class _BatchItem:
+    __slots__ = ("url", "depends_on", "stale", "result", "error")
+
+    def __init__(self, url: str, depends_on: Optional[int]):
+        self.url = url
+        self.depends_on = depends_on
+        self.stale = None
+        self.result = None
+        self.error = None
+
+
+class GraphBatch:
+    """
+    Collects the Graph GETs issued by the tool calls of one requires_action step
+    and sends them as JSON $batch calls (max 20 sub-requests each).
+    - flushed as soon as every tool call of the step is waiting or finished,
+      at the latest GRAPH_BATCH_WINDOW after the first queued request
+    - identical URLs are requested once; a request that needs another one uses
+      dependsOn and gets 424 when its dependency failed
+    - cache hits never enter the batch; throttled sub-responses and a failed
+      $batch call fall back to the retrying single request
+    """
+    def __init__(self, session_id: str, participants: int):
+        self.session_id = session_id
+        self.participants = participants
+        self._cond = Condition()
+        self._queue: List[tuple] = []   # (token, [items]) per request_many call
+        self._opened_at = None
+        self._waiting = 0
+        self._finished = 0
+        self._flushing = False
+
+    @contextmanager
+    def participant(self):
+        """Runs one tool call of the step; its Graph requests go through this batch."""
+        _current.batch = self
+        try:
+            yield
+        finally:
+            _current.batch = None
+            with self._cond:
+                self._finished += 1
+                self._cond.notify_all()
+
+    def request_many(self, paths: List[str], token: str, depends_on: Optional[Dict[int, int]] = None) -> List[GraphResponse]:
+        items = [_BatchItem(graph_client.url(path), (depends_on or {}).get(i)) for i, path in enumerate(paths)]
+        for item in items:
+            item.result, item.stale = graph_cache.lookup(self.session_id, item.url)
+        if all(item.result is not None for item in items):
+            return [item.result for item in items]
+
+        with self._cond:
+            self._queue.append((token, items))
+            if self._opened_at is None:
+                self._opened_at = time.monotonic()
+            self._waiting += 1
+            self._cond.notify_all()
+            try:
+                while any(item.result is None and item.error is None for item in items):
+                    if self._flushing:
+                        self._cond.wait()
+                        continue
+                    remaining = self._opened_at + GRAPH_BATCH_WINDOW - time.monotonic() if self._queue else 0
+                    if self._queue and (self._waiting + self._finished >= self.participants or remaining <= 0):
+                        # Bu thread kuyruktaki tüm istekleri (diğer tool'larınkiler dahil) gönderir
+                        groups, self._queue, self._opened_at = self._queue, [], None
+                        self._flushing = True
+                        self._cond.release()
+                        try:
+                            self._flush(groups)
+                        finally:
+                            self._cond.acquire()
+                            self._flushing = False
+                            self._cond.notify_all()
+                    else:
+                        self._cond.wait(timeout=max(remaining, 0.001))
+            finally:
+                self._waiting -= 1
+
+        for item in items:
+            if item.error is not None:
+                raise item.error
+        return [item.result for item in items]
+
+    def _flush(self, groups: List[tuple]):
+        try:
+            self._send(groups)
+        except Exception as e:
+            print(f"Graph $batch failed, falling back to single requests: {e}")
+        for token, items in groups:
+            for item in items:
+                if item.result is None and item.error is None:
+                    self._resolve_single(token, items, item)
+
+    def _resolve_single(self, token: str, items: List[_BatchItem], item: _BatchItem):
+        if item.depends_on is not None:
+            dependency = items[item.depends_on]
+            if dependency.result is None and dependency.error is None:
+                self._resolve_single(token, items, dependency)
+            if dependency.result is None or dependency.result.status_code != 200:
+                item.result = _failed_dependency(dependency.url)
+                return
+        try:
+            item.result = graph_cache.get(self.session_id, item.url, token)
+        except Exception as e:
+            item.error = e
+
+    def _send(self, groups: List[tuple]):
+        base = graph_client.base_url
+        request_ids: Dict[str, str] = {}   # url -> sub-request id
+        chunk_of: Dict[str, int] = {}      # url -> chunk index
+        chunks: List[List[dict]] = [[]]
+        for _, items in groups:
+            new_items = [item for item in items
+                         if item.result is None and item.url.startswith(base + "/") and item.url not in request_ids]
+            # Bir tool'un istekleri (ve bağımlılıkları) mümkünse aynı $batch içinde kalır
+            if chunks[-1] and len(chunks[-1]) + len(new_items) > GRAPH_BATCH_MAX_REQUESTS:
+                chunks.append([])
+            for item in new_items:
+                if item.url in request_ids:
+                    continue
+                if len(chunks[-1]) >= GRAPH_BATCH_MAX_REQUESTS:
+                    chunks.append([])
+                request_ids[item.url] = str(len(request_ids) + 1)
+                chunk_of[item.url] = len(chunks) - 1
+                request = {"id": request_ids[item.url], "method": "GET", "url": item.url[len(base):]}
+                if item.stale is not None and item.stale.etag:
+                    request["headers"] = {"If-None-Match": item.stale.etag}
+                if item.depends_on is not None:
+                    dependency_url = items[item.depends_on].url
+                    if chunk_of.get(dependency_url) == chunk_of[item.url]:
+                        request["dependsOn"] = [request_ids[dependency_url]]
+                chunks[-1].append(request)
+
+        urls_by_id = {request_id: url for url, request_id in request_ids.items()}
+        results: Dict[str, GraphResponse] = {}
+        for chunk in chunks:
+            if not chunk:
+                continue
+            resp = graph_client.request("POST", "/$batch", groups[0][0], json={"requests": chunk})
+            if resp.status_code != 200:
+                print(f"Graph $batch returned {resp.status_code}, falling back to single requests")
+                continue
+            for sub in resp.json().get("responses", []):
+                url = urls_by_id.get(str(sub.get("id")))
+                status = sub.get("status")
+                if url is None or status in RETRY_STATUSES:
+                    continue
+                body = sub.get("body")
+                headers = sub.get("headers") or {}
+                etag = next((value for name, value in headers.items() if name.lower() == "etag"), None)
+                text = json.dumps(body) if isinstance(body, (dict, list)) else (body or "")
+                stale = next((item.stale for _, items in groups for item in items if item.url == url), None)
+                results[url] = graph_cache.update(self.session_id, url, status,
+                                                  body if status == 200 and isinstance(body, dict) else None,
+                                                  text, etag, stale)
+
+        for _, items in groups:
+            for item in items:
+                if item.result is None and item.url in results:
+                    item.result = results[item.url]
+
+
+def current_batch(session_id: str) -> Optional[GraphBatch]:
+    batch = getattr(_current, "batch", None)
+    if batch is not None and batch.session_id == session_id:
+        return batch
+    return None
+
+
+def graph_get_many(session_id: str, paths: List[str], token: str,
+                   depends_on: Optional[Dict[int, int]] = None) -> List[GraphResponse]:
+    """
+    Fetches several Graph resources; depends_on maps a path index to the index
+    it needs (e.g. lists -> site). Inside a tool step the requests are batched.
+    """
+    batch = current_batch(session_id)
+    if batch is not None:
+        return batch.request_many(paths, token, depends_on)
+    results: List[GraphResponse] = []
+    for i, path in enumerate(paths):
+        dependency = (depends_on or {}).get(i)
+        if dependency is not None and results[dependency].status_code != 200:
+            results.append(_failed_dependency(graph_client.url(paths[dependency])))
+            continue
+        results.append(graph_cache.get(session_id, path, token))
+    return results
+
+
+def graph_get(session_id: str, path: str, token: str) -> GraphResponse:
+    return graph_get_many(session_id, [path], token)[0]
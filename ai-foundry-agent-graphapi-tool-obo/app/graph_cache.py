@@ -0,0 +1,145 @@
+import os
+import re
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Dict, Optional, Tuple
+from .graph_client import graph_client
+
+GRAPH_CACHE_MAX_ENTRIES = int(os.getenv("GRAPH_CACHE_MAX_ENTRIES", 1000))
+GRAPH_CACHE_MAX_BYTES = int(os.getenv("GRAPH_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+# Resource type -> TTL (seconds); the first matching pattern wins
+GRAPH_CACHE_TTLS = [
+    (re.compile(r"/me(\?|$)"), int(os.getenv("GRAPH_CACHE_TTL_ME", 300))),
+    (re.compile(r"/users(\?|$)"), int(os.getenv("GRAPH_CACHE_TTL_USERS", 120))),
+    (re.compile(r"/sites/[^?]+/lists(\?|$)"), int(os.getenv("GRAPH_CACHE_TTL_LISTS", 60))),
+    (re.compile(r"/sites/"), int(os.getenv("GRAPH_CACHE_TTL_SITES", 600))),
+]
+
+
+class GraphResponse:
+    """Status, parsed JSON body and raw text of a Graph GET, as served from the cache or the network."""
+    __slots__ = ("status_code", "data", "text", "etag", "from_cache")
+
+    def __init__(self, status_code: int, data: Optional[Dict[str, Any]], text: str,
+                 etag: Optional[str] = None, from_cache: bool = False):
+        self.status_code = status_code
+        self.data = data
+        self.text = text
+        self.etag = etag
+        self.from_cache = from_cache
+
+
+def ttl_for(url: str) -> int:
+    for pattern, ttl in GRAPH_CACHE_TTLS:
+        if pattern.search(url):
+            return ttl
+    return 0
+
+
+class GraphResponseCache:
+    """
+    Per-session TTL cache for Graph GET responses.
+    - key: (session id, full URL including the query); sessions never share entries
+    - TTL per resource type (GRAPH_CACHE_TTLS); only 200 responses are stored
+    - an expired entry with an ETag is revalidated with If-None-Match; a 304
+      renews it without transferring the body again
+    - bounded by entry count and body size, least recently used entries are evicted
+    """
+    def __init__(self, max_entries: int = GRAPH_CACHE_MAX_ENTRIES, max_bytes: int = GRAPH_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[GraphResponse, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = RLock()
+        self._hits = 0
+        self._misses = 0
+        self._revalidated = 0
+        self._evictions = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _store(self, key, resp: GraphResponse, ttl: int):
+        size = len(resp.text)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (resp, time.monotonic() + ttl, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def lookup(self, session_id: str, url: str) -> Tuple[Optional[GraphResponse], Optional[GraphResponse]]:
+        """Returns (fresh, stale): a still valid entry, or the expired entry to revalidate."""
+        key = (session_id, url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                cached, expires_at, _ = entry
+                if time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return GraphResponse(cached.status_code, cached.data, cached.text, cached.etag, from_cache=True), None
+                self._misses += 1
+                return None, cached
+            self._misses += 1
+        return None, None
+
+    def update(self, session_id: str, url: str, status_code: int, data: Optional[Dict[str, Any]], text: str,
+               etag: Optional[str], stale: Optional[GraphResponse]) -> GraphResponse:
+        """Records a network response (direct or from a $batch) and returns what the caller should use."""
+        key = (session_id, url)
+        ttl = ttl_for(url)
+        if status_code == 304 and stale is not None:
+            with self._lock:
+                self._revalidated += 1
+            self._store(key, stale, ttl)
+            return GraphResponse(stale.status_code, stale.data, stale.text, stale.etag, from_cache=True)
+        result = GraphResponse(status_code, data, text, etag)
+        if status_code == 200 and data is not None and ttl > 0:
+            self._store(key, result, ttl)
+        else:
+            with self._lock:
+                self._remove(key)
+        return result
+
+    def get(self, session_id: str, path: str, token: str) -> GraphResponse:
+        url = graph_client.url(path)
+        fresh, stale = self.lookup(session_id, url)
+        if fresh is not None:
+            return fresh
+        headers = {"If-None-Match": stale.etag} if stale is not None and stale.etag else None
+        resp = graph_client.get(url, token, headers=headers)
+        data = None
+        if resp.status_code == 200:
+            try:
+                data = resp.json()
+            except ValueError:
+                data = None
+        return self.update(session_id, url, resp.status_code, data, resp.text, resp.headers.get("ETag"), stale)
+
+    def clear_session(self, session_id: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "revalidated": self._revalidated,
+                "evictions": self._evictions,
+            }
+
+
+graph_cache = GraphResponseCache()
@@ -0,0 +1,110 @@
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+GRAPH_CONNECT_TIMEOUT = float(os.getenv("GRAPH_CONNECT_TIMEOUT", 5))  # seconds
+GRAPH_READ_TIMEOUT = float(os.getenv("GRAPH_READ_TIMEOUT", 20))  # seconds
+GRAPH_MAX_RETRIES = int(os.getenv("GRAPH_MAX_RETRIES", 3))
+GRAPH_RETRY_BACKOFF = float(os.getenv("GRAPH_RETRY_BACKOFF", 0.5))  # seconds, doubled per attempt
+GRAPH_MAX_RETRY_WAIT = float(os.getenv("GRAPH_MAX_RETRY_WAIT", 10))  # longer Retry-After values are not waited for
+GRAPH_POOL_SIZE = int(os.getenv("GRAPH_POOL_SIZE", 16))
+RETRY_STATUSES = (429, 503, 504)
+
+
+def _retry_after_seconds(resp: requests.Response) -> Optional[float]:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class GraphClient:
+    """
+    Shared HTTP transport for Microsoft Graph.
+    - one requests.Session with a connection pool, so calls reuse keep-alive connections
+    - every request has a connect/read timeout
+    - 429/503/504 and connection errors are retried with exponential backoff;
+      Retry-After is honoured up to GRAPH_MAX_RETRY_WAIT, after that the
+      throttled response is returned to the caller as is
+    """
+    def __init__(self, base_url: str = GRAPH_BASE_URL, max_retries: int = GRAPH_MAX_RETRIES,
+                 pool_size: int = GRAPH_POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (GRAPH_CONNECT_TIMEOUT, GRAPH_READ_TIMEOUT)
+        self.max_retries = max(0, max_retries)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._lock = Lock()
+        self._requests = 0
+        self._retries = 0
+        self._throttled = 0
+
+    def url(self, path: str) -> str:
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _backoff(self, attempt: int) -> float:
+        delay = GRAPH_RETRY_BACKOFF * (2 ** attempt)
+        return delay + random.uniform(0, delay / 2)
+
+    def request(self, method: str, path: str, token: str, headers: Optional[Dict[str, str]] = None,
+                **kwargs) -> requests.Response:
+        request_headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+        if headers:
+            request_headers.update(headers)
+        url = self.url(path)
+        attempt = 0
+        while True:
+            with self._lock:
+                self._requests += 1
+            try:
+                resp = self._session.request(method, url, headers=request_headers, timeout=self.timeout, **kwargs)
+            except requests.ConnectionError:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if resp.status_code not in RETRY_STATUSES:
+                    return resp
+                with self._lock:
+                    self._throttled += 1
+                if attempt >= self.max_retries:
+                    return resp
+                retry_after = _retry_after_seconds(resp)
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                if delay > GRAPH_MAX_RETRY_WAIT:
+                    return resp
+            with self._lock:
+                self._retries += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, path: str, token: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, token, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "retries": self._retries,
+                "throttled": self._throttled,
+            }
+
+
+graph_client = GraphClient()
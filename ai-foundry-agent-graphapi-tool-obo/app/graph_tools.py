@@ -1,7 +1,8 @@
 import json
-import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from .token_store import token_store
+from .graph_client import graph_client
+from .graph_batch import graph_get, graph_get_many
 
 def _get_token_or_error(session_id: str):
     token = token_store.get_access_token(session_id)
@@ -12,11 +13,9 @@ def _get_token_or_error(session_id: str):
 def get_current_user_info(session_id: str) -> str:
     token, err = _get_token_or_error(session_id)
     if err: return err
-    url = "https://graph.microsoft.com/v1.0/me"
-    headers = {"Authorization": f"Bearer {token}", "Accept": "text/html, application/json"}
-    resp = requests.get(url, headers=headers)
+    resp = graph_get(session_id, "/me", token)
     if resp.status_code == 200:
-        u = resp.json()
+        u = resp.data
         return json.dumps({
             "success": True,
             "user": {
@@ -35,11 +34,9 @@ def get_current_user_info(session_id: str) -> str:
 def list_users(session_id: str) -> str:
     token, err = _get_token_or_error(session_id)
     if err: return err
-    url = "https://graph.microsoft.com/v1.0/users?$top=5"
-    headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
-    resp = requests.get(url, headers=headers)
+    resp = graph_get(session_id, "/users?$top=5", token)
     if resp.status_code == 200:
-        data = resp.json()
+        data = resp.data
         return json.dumps({
             "success": True,
             "count": len(data.get("value", [])),
@@ -59,13 +56,11 @@ def list_users(session_id: str) -> str:
         })
     return json.dumps({"error": f"Graph error {resp.status_code}", "message": resp.text})
 
-def get_sharepoint_site(session_id: str, site_url: str = None) -> str:
+def _resolve_site_url(site_url: str = None) -> Tuple[str, str, Optional[str]]:
     """
-    Get SharePoint site information by URL or use default site.
+    Maps a SharePoint site URL to its Graph URLs. Returns (site_url, lists_url, error);
+    both Graph URLs address the site by path, so the lists need no site id.
     """
-    token, err = _get_token_or_error(session_id)
-    if err: return err
-    
     # Default to your specific SharePoint site
     if not site_url:
         site_url = "YOUR_DEFAULT_SHAREPOINT_SITE_URL_HERE"
@@ -89,42 +84,43 @@ def get_sharepoint_site(session_id: str, site_url: str = None) -> str:
         # Construct the Graph API URL for the site
         # Format: /sites/{hostname}:/{site-path}
         if site_path:
-            graph_url = f"https://graph.microsoft.com/v1.0/sites/{hostname}:{site_path}"
+            graph_url = graph_client.url(f"/sites/{hostname}:{site_path}")
+            lists_url = f"{graph_url}:/lists"
         else:
-            graph_url = f"https://graph.microsoft.com/v1.0/sites/{hostname}"
+            graph_url = graph_client.url(f"/sites/{hostname}")
+            lists_url = f"{graph_url}/lists"
             
     except Exception as e:
-        return json.dumps({
+        return site_url, site_url, json.dumps({
             "error": "Invalid SharePoint URL",
             "details": str(e),
             "example": "YOUR_DEFAULT_SHAREPOINT_SITE_URL_HERE"
         })
-    
-    headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
-    resp = requests.get(graph_url, headers=headers)
-    
+    return graph_url, lists_url, None
+
+def _parse_site(resp, graph_url: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Returns (site, error); error is the JSON tool output to return when the
+    site could not be fetched.
+    """
     if resp.status_code == 200:
-        site_data = resp.json()
-        return json.dumps({
-            "success": True,
-            "site": {
-                "id": site_data.get("id"),
-                "name": site_data.get("name"),
-                "displayName": site_data.get("displayName"),
-                "webUrl": site_data.get("webUrl"),
-                "description": site_data.get("description"),
-                "createdDateTime": site_data.get("createdDateTime"),
-                "lastModifiedDateTime": site_data.get("lastModifiedDateTime"),
-                "siteCollection": {
-                    "hostname": site_data.get("siteCollection", {}).get("hostname"),
-                    "dataLocationCode": site_data.get("siteCollection", {}).get("dataLocationCode"),
-                    "root": site_data.get("siteCollection", {}).get("root")
-                }
-            },
-            "graph_api_url": graph_url
-        })
+        site_data = resp.data
+        return {
+            "id": site_data.get("id"),
+            "name": site_data.get("name"),
+            "displayName": site_data.get("displayName"),
+            "webUrl": site_data.get("webUrl"),
+            "description": site_data.get("description"),
+            "createdDateTime": site_data.get("createdDateTime"),
+            "lastModifiedDateTime": site_data.get("lastModifiedDateTime"),
+            "siteCollection": {
+                "hostname": site_data.get("siteCollection", {}).get("hostname"),
+                "dataLocationCode": site_data.get("siteCollection", {}).get("dataLocationCode"),
+                "root": site_data.get("siteCollection", {}).get("root")
+            }
+        }, None
     elif resp.status_code == 403:
-        return json.dumps({
+        return None, json.dumps({
             "error": "Insufficient permissions to access SharePoint site",
             "status": resp.status_code,
             "hint": "Ensure Sites.Read.All or Sites.ReadWrite.All permission is granted",
@@ -132,19 +128,36 @@ def get_sharepoint_site(session_id: str, site_url: str = None) -> str:
             "attempted_url": graph_url
         })
     elif resp.status_code == 404:
-        return json.dumps({
+        return None, json.dumps({
             "error": "SharePoint site not found",
             "status": resp.status_code,
             "attempted_url": graph_url,
             "hint": "Check if the site URL is correct and you have access"
         })
     else:
-        return json.dumps({
+        return None, json.dumps({
             "error": f"Graph API error {resp.status_code}",
             "message": resp.text,
             "attempted_url": graph_url
         })
 
+def get_sharepoint_site(session_id: str, site_url: str = None) -> str:
+    """
+    Get SharePoint site information by URL or use default site.
+    """
+    token, err = _get_token_or_error(session_id)
+    if err: return err
+    
+    graph_url, _, err = _resolve_site_url(site_url)
+    if err: return err
+    site, err = _parse_site(graph_get(session_id, graph_url, token), graph_url)
+    if err: return err
+    return json.dumps({
+        "success": True,
+        "site": site,
+        "graph_api_url": graph_url
+    })
+
 def get_sharepoint_site_lists(session_id: str, site_id: str = None) -> str:
     """
     Get lists from a SharePoint site. If site_id is not provided, 
@@ -155,23 +168,19 @@ def get_sharepoint_site_lists(session_id: str, site_id: str = None) -> str:
     
     # If no site_id provided, get the default site first
     if not site_id:
-        site_result = get_sharepoint_site(session_id)
-        try:
-            site_data = json.loads(site_result)
-            if site_data.get("success"):
-                site_id = site_data["site"]["id"]
-            else:
-                return site_result  # Return the error from get_sharepoint_site
-        except:
-            return json.dumps({"error": "Failed to get default site"})
-    
-    # Get lists from the site
-    url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/lists"
-    headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
-    resp = requests.get(url, headers=headers)
+        graph_url, lists_url, err = _resolve_site_url()
+        if err: return err
+        # Site ve listeleri tek adımda istenir; liste isteği site isteğine bağlıdır (dependsOn)
+        site_resp, resp = graph_get_many(session_id, [graph_url, lists_url], token, depends_on={1: 0})
+        site, err = _parse_site(site_resp, graph_url)
+        if err: return err  # Return the error from the site lookup
+        site_id = site["id"]
+    else:
+        # Get lists from the site
+        resp = graph_get(session_id, f"/sites/{site_id}/lists", token)
     
     if resp.status_code == 200:
-        lists_data = resp.json()
+        lists_data = resp.data
         return json.dumps({
             "success": True,
             "site_id": site_id,
@@ -4,7 +4,8 @@ from flask import url_for
 from dotenv import load_dotenv
 import msal
 from .token_store import token_store
-from .agent_runner import run_agent
+from .graph_cache import graph_cache
+from .agent_runner import run_agent, end_session
 
 load_dotenv()
 app = Flask(__name__, static_folder="../static", static_url_path="/static")
@@ -84,6 +85,9 @@ def logout():
     sid = session.pop("session_id", None)
     if sid:
         token_store.delete(sid)
+        graph_cache.clear_session(sid)
+        # Oturumun agent thread'lerini sil
+        end_session(sid)
     return redirect(url_for("login"))
 
 # Optional: health check
@@ -0,0 +1,125 @@
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, RLock
+
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", 4))
+AGENT_QUEUE_SIZE = int(os.getenv("AGENT_QUEUE_SIZE", 16))
+AGENT_RUN_TIMEOUT = float(os.getenv("AGENT_RUN_TIMEOUT", 300))  # saniye
+
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Agent queue is full, retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class AgentExecutor:
+    """
+    Bounded worker pool for agent runs.
+    - at most `workers` agent runs execute at the same time
+    - at most `queue_size` further runs wait for a worker
+    - submissions beyond that are rejected immediately with QueueFullError
+      (the caller answers 429 + Retry-After instead of tying up a request thread)
+    """
+    def __init__(self, workers=AGENT_WORKERS, queue_size=AGENT_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="agent")
+        self._slots = BoundedSemaphore(self.workers + self.queue_size)
+        self._lock = RLock()
+        self._queued = 0
+        self._running = 0
+        self._submitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_times = deque(maxlen=500)  # son işlerin kuyrukta bekleme süreleri
+        self._run_times = deque(maxlen=500)   # son işlerin çalışma süreleri
+
+    def _retry_after(self):
+        with self._lock:
+            average_run = sum(self._run_times) / len(self._run_times) if self._run_times else 5.0
+            backlog = self._queued + self._running
+        return max(1, math.ceil(average_run * backlog / self.workers))
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise QueueFullError(self._retry_after())
+
+        enqueued_at = time.monotonic()
+        with self._lock:
+            self._queued += 1
+            self._submitted += 1
+
+        def task():
+            started_at = time.monotonic()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._wait_times.append(started_at - enqueued_at)
+            failed = False
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._run_times.append(time.monotonic() - started_at)
+                    if failed:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+                self._slots.release()
+
+        try:
+            return self._executor.submit(task)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+
+    def run(self, fn, *args, timeout=AGENT_RUN_TIMEOUT, **kwargs):
+        return self.submit(fn, *args, **kwargs).result(timeout=timeout)
+
+    def stats(self):
+        with self._lock:
+            wait_times = sorted(self._wait_times)
+            run_times = sorted(self._run_times)
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "running": self._running,
+                "queue_depth": self._queued,
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+                "completed": self._completed,
+                "failed": self._failed,
+                "wait_ms": _summary(wait_times),
+                "run_ms": _summary(run_times),
+            }
+
+
+def _summary(sorted_values):
+    if not sorted_values:
+        return {"avg": 0, "p50": 0, "p95": 0, "max": 0}
+
+    def percentile(p):
+        return round(sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))] * 1000, 1)
+
+    return {
+        "avg": round(sum(sorted_values) / len(sorted_values) * 1000, 1),
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "max": round(sorted_values[-1] * 1000, 1),
+    }
+
+
+agent_executor = AgentExecutor()
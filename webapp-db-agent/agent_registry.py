@@ -0,0 +1,138 @@
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock, RLock
+
+AGENT_REGISTRY_MAX_SIZE = int(os.getenv("AGENT_REGISTRY_MAX_SIZE", 100))
+AGENT_REGISTRY_IDLE_TIMEOUT = float(os.getenv("AGENT_REGISTRY_IDLE_TIMEOUT", 1800))  # saniye
+
+
+class _AgentEntry:
+    __slots__ = ("agent", "lock", "last_used")
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.lock = Lock()  # aynı oturumun istekleri sırayla çalışır (hafıza thread-safe değil)
+        self.last_used = time.monotonic()
+
+
+class AgentRegistry:
+    """
+    Session-keyed agent instances.
+    - every chat session gets its own agent (and so its own conversation memory)
+    - at most max_size agents are kept; the least recently used idle one is evicted
+    - agents unused for idle_timeout seconds are dropped
+    - turns remembered for a session without an agent are applied when its agent is built
+    Requests of different sessions run in parallel, requests of the same session
+    are serialized on the session lock.
+    """
+    def __init__(self, factory, max_size=AGENT_REGISTRY_MAX_SIZE, idle_timeout=AGENT_REGISTRY_IDLE_TIMEOUT):
+        self._factory = factory
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self._entries = OrderedDict()
+        self._pending = OrderedDict()  # session_id -> agent kurulunca uygulanacak işlemler
+        self._lock = RLock()
+        self._created = 0
+        self._evicted = 0
+
+    def _evict(self):
+        now = time.monotonic()
+        for session_id, entry in list(self._entries.items()):
+            if now - entry.last_used > self.idle_timeout and not entry.lock.locked():
+                del self._entries[session_id]
+                self._evicted += 1
+        # LRU: en eski (OrderedDict başı) ve o an kullanılmayan agent'lar çıkarılır
+        for session_id, entry in list(self._entries.items()):
+            if len(self._entries) <= self.max_size:
+                break
+            if not entry.lock.locked():
+                del self._entries[session_id]
+                self._evicted += 1
+
+    def _get_entry(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._entries.move_to_end(session_id)
+                entry.last_used = time.monotonic()
+                return entry
+        # Agent kurulumu kilit dışında yapılır; diğer oturumlar beklemez
+        entry = _AgentEntry(self._factory())
+        with self._lock:
+            existing = self._entries.get(session_id)
+            if existing is not None:
+                return existing
+            for apply in self._pending.pop(session_id, ()):
+                apply(entry.agent)
+            self._entries[session_id] = entry
+            self._created += 1
+            self._evict()
+        return entry
+
+    @contextmanager
+    def session(self, session_id):
+        entry = self._get_entry(session_id)
+        with entry.lock:
+            entry.last_used = time.monotonic()
+            yield entry.agent
+
+    @contextmanager
+    def existing(self, session_id):
+        """
+        Oturumun agent'ını kurmadan ve beklemeden kilitler.
+        Agent yoksa ya da o an başka bir istek kullanıyorsa None verir.
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+        if entry is None or not entry.lock.acquire(blocking=False):
+            yield None
+            return
+        try:
+            entry.last_used = time.monotonic()
+            yield entry.agent
+        finally:
+            entry.lock.release()
+
+    def is_active(self, session_id):
+        """Oturumun agent'ı ya da agent'ını bekleyen işlemleri var mı."""
+        with self._lock:
+            return session_id in self._entries or session_id in self._pending
+
+    def remember(self, session_id, apply):
+        """
+        apply(agent) oturumun agent'ına uygulanır; agent yoksa kurulmaz,
+        işlem agent ilk kez kurulduğunda uygulanmak üzere saklanır.
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self._pending.setdefault(session_id, []).append(apply)
+                self._pending.move_to_end(session_id)
+                while len(self._pending) > self.max_size:
+                    self._pending.popitem(last=False)
+                return
+        with entry.lock:
+            apply(entry.agent)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+            self._pending.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._entries),
+                "busy": sum(1 for entry in self._entries.values() if entry.lock.locked()),
+                "pending": len(self._pending),
+                "max_size": self.max_size,
+                "created": self._created,
+                "evicted": self._evicted,
+            }
@@ -0,0 +1,82 @@
+import os
+import re
+import time
+from collections import OrderedDict
+from threading import RLock
+
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", 600))  # saniye
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1000))
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = " ?!.…"
+
+
+def normalize_question(question):
+    """Büyük/küçük harf, boşluk ve sondaki noktalama farklarını yok sayar."""
+    return _WHITESPACE_PATTERN.sub(" ", question.casefold()).strip().rstrip(_TRAILING_PUNCTUATION)
+
+
+class AnswerCache:
+    """
+    Cache of final agent answers in front of agent.run().
+    Key: (normalized question, database connection, LLM model). Entries expire after ttl
+    seconds; at most max_entries are kept, least recently used first out.
+    Only first questions of a session are served and stored (follow-ups depend on the
+    history), and turns that used the clock, volatile SQL, Python or several databases
+    are never stored. Data-modifying statements invalidate the connection's answers.
+    """
+    def __init__(self, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = RLock()
+        self._hits = 0
+        self._misses = 0
+        self._skipped = 0
+
+    def make_key(self, question, connection_key, model_key):
+        return (normalize_question(question), connection_key, model_key)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[0]:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def skip(self):
+        """İstek önbelleği kullanmak istemediğinde (opt-out) sayacı artırır."""
+        with self._lock:
+            self._skipped += 1
+
+    def invalidate(self, connection_key=None):
+        with self._lock:
+            for key in list(self._entries):
+                if connection_key is None or key[1] == connection_key:
+                    del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "skipped": self._skipped,
+            }
+
+
+answer_cache = AnswerCache()
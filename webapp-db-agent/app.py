@@ -1,14 +1,43 @@
-from flask import Flask, request, jsonify, render_template, session
+import time
+_MODULE_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, request, jsonify, render_template, session, Response
 from flask_cors import CORS
 import os
 import json
-from langchain_openai import AzureChatOpenAI
-from langchain.agents import initialize_agent, Tool
-from langchain_experimental.tools import PythonREPLTool
-from langchain.memory import ConversationBufferMemory
-import psycopg2
-import pandas as pd
 import re
+import uuid
+from contextlib import contextmanager, nullcontext
+# Ağır bağımlılıklar (langchain, pandas, psycopg2) ilk kullanıldıkları fonksiyonlarda import edilir
+from db_pool import db_pool, config_key, connect
+from config_store import JsonConfigStore
+from schema_cache import schema_cache, SCHEMA_FINGERPRINT_QUERY
+from result_cache import result_cache
+from observation_format import format_table_compact
+from schema_index import schema_indexes, SCHEMA_TABLE_VERSIONS_QUERY, SCHEMA_COLUMNS_QUERY, SCHEMA_FOREIGN_KEYS_QUERY
+from response_renderer import ResponseRenderer, render_response
+from agent_registry import AgentRegistry
+from llm_registry import LLMClientRegistry, llm_config_key
+from answer_cache import answer_cache
+from sql_guard import guard_query, leading_keyword, QueryRejectedError, CURSOR_STATEMENTS, SQL_STATEMENT_TIMEOUT_MS
+from run_control import RunControl, RunCancelledError
+from agent_executor import agent_executor, QueueFullError, AGENT_RUN_TIMEOUT
+from fan_out import fan_out_executor, FANOUT_TIMEOUT
+from request_metrics import RequestTrace, metrics, METRICS_TIMING_HEADER
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Lock, local
+import queue
+
+# Başlangıç süreleri (ms) - worker açılışı ve ölçeklenme gecikmesini ölçmek için /api/startup ile raporlanır
+STARTUP_TIMINGS = {}
+
+@contextmanager
+def startup_timer(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS.setdefault(name, round((time.perf_counter() - started) * 1000, 1))
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 app.secret_key = "database_connection_secret_key"  # Session için gerekli
@@ -52,35 +81,38 @@ LLM_CONFIG = DEFAULT_LLM_CONFIG.copy()
 # Aktif dil modeli adını tutacak değişken
 ACTIVE_MODEL_NAME = "Varsayılan"
 
+# Model ve bağlantı kayıtları bellekte tutulur; dosyalar atomik yazılır, dışarıdan değişirse (mtime) yeniden okunur
+llm_models_store = JsonConfigStore(LLM_MODELS_FILE)
+db_connections_store = JsonConfigStore(DB_CONNECTIONS_FILE)
+
 # Dil modeli yapılandırmalarını yükle - Güncelleme
 def load_llm_models():
-    if os.path.exists(LLM_MODELS_FILE):
-        try:
-            with open(LLM_MODELS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+    return llm_models_store.all()
+
+# Hem eski format (doğrudan config) hem de yeni format ({"config": ..., "is_default": ...}) desteklenir
+def get_llm_model_config(name):
+    data = llm_models_store.get(name)
+    if data is None:
+        return None
+    return data["config"] if isinstance(data, dict) and "config" in data else data
 
 # Dil modeli yapılandırmalarını kaydet - Güncelleme
 def save_llm_model(name, config, is_default=False):
-    models = load_llm_models()
-    
-    # Yeni modeli is_default bilgisiyle kaydet
-    models[name] = {
-        "config": config,
-        "is_default": is_default
-    }
-    
-    # Eğer bu model varsayılan olarak işaretlendiyse, diğerlerini varsayılan olmaktan çıkar
-    if is_default:
-        for model_name in models:
-            if model_name != name:
-                if "is_default" in models[model_name]:
-                    models[model_name]["is_default"] = False
+    def apply(models):
+        # Yeni modeli is_default bilgisiyle kaydet
+        models[name] = {
+            "config": config,
+            "is_default": is_default
+        }
+        
+        # Eğer bu model varsayılan olarak işaretlendiyse, diğerlerini varsayılan olmaktan çıkar
+        if is_default:
+            for model_name in models:
+                if model_name != name:
+                    if "is_default" in models[model_name]:
+                        models[model_name]["is_default"] = False
     
-    with open(LLM_MODELS_FILE, 'w') as f:
-        json.dump(models, f)
+    llm_models_store.update(apply)
 
 # Uygulama başlangıcında varsayılan dil modelini yükle
 def load_default_llm_model():
@@ -118,57 +150,23 @@ def load_default_llm_model():
     
     return ACTIVE_MODEL_NAME
 
-# Mevcut tanımlı dil modellerini yükle
-LLM_MODELS = load_llm_models()
-
-# İlk başlangıçta varsayılan modeli yükle
-ACTIVE_MODEL_NAME = load_default_llm_model()
-
-# Veritabanı bağlantılarını yükle - Debug eklenmiş
+# Veritabanı bağlantılarını yükle
 def load_db_connections():
-    print(f"Loading DB connections from: {os.path.abspath(DB_CONNECTIONS_FILE)}")
-    if os.path.exists(DB_CONNECTIONS_FILE):
-        try:
-            with open(DB_CONNECTIONS_FILE, 'r') as f:
-                connections = json.load(f)
-                print(f"Loaded connections: {connections.keys()}")
-                return connections
-        except Exception as e:
-            print(f"Error loading connections: {str(e)}")
-            return {}
-    else:
-        print("Connections file does not exist")
-        return {}
+    return db_connections_store.all()
 
 # Veritabanı bağlantılarını kaydet - Güncelleme
 def save_db_connection(name, config):
-    connections = load_db_connections()
-    connections[name] = config
     try:
-        with open(DB_CONNECTIONS_FILE, 'w') as f:
-            json.dump(connections, f)
+        db_connections_store.set(name, config)
         print(f"Saved connection '{name}' to {DB_CONNECTIONS_FILE}")
         return True
     except Exception as e:
         print(f"Error saving connection: {str(e)}")
         return False
 
-# Uygulama başlangıcında çağırın
+# Uygulama başlangıcında çağırın - dosya yoksa ya da geçersiz JSON ise boş olarak oluşturulur
 def initialize_connections_file():
-    if os.path.exists(DB_CONNECTIONS_FILE):
-        try:
-            # Dosyayı açıp geçerli JSON olup olmadığını kontrol et
-            with open(DB_CONNECTIONS_FILE, 'r') as f:
-                json.load(f)
-        except:
-            # Geçersiz JSON dosyasını yeniden oluştur
-            print(f"Invalid JSON file found. Recreating {DB_CONNECTIONS_FILE}")
-            with open(DB_CONNECTIONS_FILE, 'w') as f:
-                json.dump({}, f)
-    else:
-        # Dosya yoksa boş bir dosya oluştur
-        with open(DB_CONNECTIONS_FILE, 'w') as f:
-            json.dump({}, f)
+    db_connections_store.ensure_file()
 
 # Test bağlantısı ekleme (geçici)
 def add_test_connection():
@@ -184,75 +182,410 @@ def add_test_connection():
         save_db_connection("Test Connection", test_config)
         print("Added test connection for debugging")
 
-# Mevcut tanımlı bağlantıları yükle
-DB_CONNECTIONS = load_db_connections()
+_initialized = False
+_initialize_lock = Lock()
+
+# Yapılandırma dosyaları modül import edilirken değil, ilk istekte bir kez yüklenir
+def initialize_app():
+    global _initialized, ACTIVE_MODEL_NAME
+    if _initialized:
+        return
+    with _initialize_lock:
+        if _initialized:
+            return
+        with startup_timer("config_load_ms"):
+            ACTIVE_MODEL_NAME = load_default_llm_model()
+            db_connections_store.names()
+        _initialized = True
 
 # 1. Azure OpenAI ile LLM ayarları
-def setup_openai_llm():
+def setup_openai_llm(config=None, streaming=False, http_client=None):
+    from langchain_openai import AzureChatOpenAI
+    config = config or LLM_CONFIG
     return AzureChatOpenAI(
-        deployment_name=LLM_CONFIG["deployment_name"],
-        azure_endpoint=LLM_CONFIG["endpoint"],
-        openai_api_version=LLM_CONFIG["api_version"],
-        openai_api_key=LLM_CONFIG["api_key"],
-        temperature=LLM_CONFIG["temperature"]
+        deployment_name=config["deployment_name"],
+        azure_endpoint=config["endpoint"],
+        openai_api_version=config["api_version"],
+        openai_api_key=config["api_key"],
+        temperature=config["temperature"],
+        streaming=streaming,
+        http_client=http_client
     )
 
+# Model yapılandırması başına tek (keep-alive bağlantılı) istemci; agent'lar yeniden kurulurken TLS tekrarlanmaz
+llm_registry = LLMClientRegistry(setup_openai_llm)
+
 # 2. PostgreSQL (Azure Cosmos ile bağlantı)
 def setup_postgresql_connection():
-    connection = psycopg2.connect(
-        host=DB_CONFIG["host"],
-        port=DB_CONFIG["port"],
-        database=DB_CONFIG["name"],
-        user=DB_CONFIG["user"],
-        password=DB_CONFIG["password"],
-        sslmode=DB_CONFIG["sslmode"]
-    )
-    return connection
+    return connect(DB_CONFIG)
 
-# 3. SQL Sorgu Tool'u
-def execute_sql_query(sql_query: str):
-    connection = setup_postgresql_connection()
-    try:
+# Bir sohbet turuna ait durum (HTML tablolar, iptal kontrolü, süre dökümü) - agent thread'ine özel
+_chat_turn = local()
+
+# SQL süresi, çekilen satır ve bayt sayısı isteğin süre dökümüne eklenir
+def _record_sql(started, rows, size):
+    trace = getattr(_chat_turn, "trace", None)
+    if trace is not None:
+        trace.add_sql((time.perf_counter() - started) * 1000, rows, size)
+
+# 3. SQL Sorgu Tool'u - bağlantılar aktif DB_CONFIG'e ait havuzdan alınır
+def execute_sql_query(sql_query: str, params=None):
+    import pandas as pd
+    started = time.perf_counter()
+    with db_pool.connection(DB_CONFIG) as connection:
         # SQL sorgusunu çalıştır
         with connection.cursor() as cursor:
-            cursor.execute(sql_query)
+            cursor.execute(sql_query, params)
             rows = cursor.fetchall()
             # Sonuçları Pandas DataFrame formatına çevir
             columns = [desc[0] for desc in cursor.description] if cursor.description else []
             df = pd.DataFrame(rows, columns=columns)
-    finally:
-        connection.close()
 
+    _record_sql(started, len(rows), sum(_row_size(row) for row in rows))
     return df
 
+# Agent'ın ürettiği sorgular için sonuç sınırları - ortam değişkenleriyle ayarlanabilir
+SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", 200))
+SQL_MAX_BYTES = int(os.getenv("SQL_MAX_BYTES", 256 * 1024))
+SQL_FETCH_SIZE = int(os.getenv("SQL_FETCH_SIZE", 100))
+
+# Sunucu tarafı (named) cursor ile çalıştırılabilen ifadeler; baştaki yorum ve parantezler atlanır
+def is_cursor_statement(sql_query):
+    return leading_keyword(sql_query) in CURSOR_STATEMENTS
+
+def _row_size(row):
+    return sum(len(str(value)) for value in row)
+
+def _declare_cursor(connection, sql_query, timeout_ms=SQL_STATEMENT_TIMEOUT_MS, read_only=False):
+    import psycopg2
+    # SELECT sorguları sunucu tarafı cursor ile satır satır çekilir; bellek tablo boyutundan bağımsız kalır
+    if is_cursor_statement(sql_query):
+        cursor = connection.cursor(name=f"agent_{uuid.uuid4().hex}")
+        try:
+            cursor.execute(sql_query)
+            return cursor, True
+        except psycopg2.NotSupportedError:
+            # Örn. WITH içinde INSERT/UPDATE - DECLARE CURSOR desteklemez, normal cursor'a dön
+            cursor.close()
+            connection.rollback()
+            # Rollback SET LOCAL ayarlarını da sildi; zaman aşımını (ve salt okunur modu) yeniden uygula
+            guard_query(connection, sql_query, max_cost=0, max_rows=0, timeout_ms=timeout_ms, read_only=read_only)
+    cursor = connection.cursor()
+    cursor.execute(sql_query)
+    return cursor, False
+
+# Sınırlı sorgu çalıştırma: en fazla max_rows satır / max_bytes veri çekilir
+# Önce EXPLAIN ile maliyet kontrolü yapılır ve statement_timeout ayarlanır; control iptal edilirse sorgu sunucuda durdurulur
+# config verilmezse aktif DB_CONFIG kullanılır; read_only işlemi sunucu tarafında salt okunur yapar
+# Dönüş: (DataFrame, toplam satır sayısı (bilinmiyorsa None), kırpıldı mı)
+def execute_sql_query_bounded(sql_query: str, max_rows=SQL_MAX_ROWS, max_bytes=SQL_MAX_BYTES, control=None,
+                              config=None, read_only=False, timeout_ms=SQL_STATEMENT_TIMEOUT_MS):
+    import pandas as pd
+    from psycopg2.extensions import QueryCanceledError
+    sql_query = sql_query.strip().rstrip(';').strip()
+    control = control or RunControl()
+    started = time.perf_counter()
+    # Aktif olmayan veritabanlarının (fan-out) havuzları geçicidir; kullanılmadıklarında kapatılır
+    with db_pool.connection(config or DB_CONFIG, temporary=config is not None) as connection, control.track(connection):
+        guard_query(connection, sql_query, timeout_ms=timeout_ms, read_only=read_only)
+        cursor, server_side = _declare_cursor(connection, sql_query, timeout_ms, read_only)
+        try:
+            rows = []
+            size = 0
+            seen = 0
+            truncated = False
+            columns = [desc[0] for desc in cursor.description] if cursor.description else []
+            while server_side or cursor.description:
+                batch = cursor.fetchmany(SQL_FETCH_SIZE)
+                # İsimli cursor'da description ilk fetch'ten sonra dolar; sıfır satırlı SELECT de kolonlarını korur
+                if not columns and cursor.description:
+                    columns = [desc[0] for desc in cursor.description]
+                if not batch:
+                    break
+                seen += len(batch)
+                for row in batch:
+                    row_size = _row_size(row)
+                    if len(rows) >= max_rows or size + row_size > max_bytes:
+                        truncated = True
+                        break
+                    rows.append(row)
+                    size += row_size
+                if truncated:
+                    break
+
+            total_rows = len(rows)
+            if truncated:
+                if server_side:
+                    # Kalan satırları istemciye çekmeden say
+                    try:
+                        with connection.cursor() as counter:
+                            counter.execute(f'MOVE FORWARD ALL IN "{cursor.name}"')
+                            total_rows = seen + int(counter.statusmessage.split()[-1])
+                    except QueryCanceledError:
+                        if control.cancelled:
+                            raise
+                        # Sayım zaman aşımına uğradı; çekilen satırlar yine de döner, toplam bilinmiyor.
+                        # İsimli cursor rollback'ten önce kapatılır (hatalı transaction'da close() sunucuya gitmez);
+                        # rollback sonrası close() "named cursor isn't valid anymore" hatası verir
+                        cursor.close()
+                        connection.rollback()
+                        total_rows = None
+                else:
+                    total_rows = cursor.rowcount
+        finally:
+            if not cursor.closed:
+                cursor.close()
+
+    _record_sql(started, len(rows), size)
+    return pd.DataFrame(rows, columns=columns), total_rows, truncated
+
 # Formatlanmış sonuçlar için yardımcı fonksiyon
 def format_dataframe_to_html(df):
     # HTML formatında tablo döndür
     return df.to_html(classes='table table-striped table-hover table-sm', index=False)
 
+# Aktif veritabanı değiştiğinde havuzu yeniden kur ve bağlantıya ait önbellekleri temizle
+def switch_database(old_config):
+    db_pool.switch(old_config, DB_CONFIG)
+    schema_cache.invalidate(config_key(old_config))
+    schema_cache.invalidate(config_key(DB_CONFIG))
+    result_cache.invalidate(config_key(old_config))
+    result_cache.invalidate(config_key(DB_CONFIG))
+    answer_cache.invalidate(config_key(old_config))
+    answer_cache.invalidate(config_key(DB_CONFIG))
+
 # 4. Tool(s) Tanımı - Tablo Metadata'sı ve Query Aracı
-def get_table_metadata(_=None):
-    query = """
-    SELECT table_schema, table_name, column_name, data_type 
-    FROM information_schema.columns 
-    where information_schema."columns".table_schema = 'public'
-    ORDER BY table_schema, table_name;
-    """
-    df = execute_sql_query(query)
-    return format_dataframe_to_html(df)
+def fetch_schema_versions():
+    df = execute_sql_query(SCHEMA_TABLE_VERSIONS_QUERY)
+    return {row[0]: tuple(row[1:]) for row in df.itertuples(index=False, name=None)}
+
+# Yalnızca değişen tabloların kolonları, yorumları ve foreign key'leri yüklenir
+def load_schema_tables(names):
+    tables = {name: ["", [], []] for name in names}
+    columns = execute_sql_query(SCHEMA_COLUMNS_QUERY, (list(names),))
+    for table_name, column_name, data_type, column_comment, table_comment in columns.itertuples(index=False, name=None):
+        table = tables.setdefault(table_name, ["", [], []])
+        table[0] = table_comment or ""
+        table[1].append((column_name, data_type, column_comment or ""))
+    foreign_keys = execute_sql_query(SCHEMA_FOREIGN_KEYS_QUERY, (list(names),))
+    for table_name, column_name, ref_table, ref_column in foreign_keys.itertuples(index=False, name=None):
+        tables[table_name][2].append((column_name, ref_table, ref_column))
+    return {name: tuple(table) for name, table in tables.items()}
 
-# SQL Sorgulama Aracı
+def load_schema_index():
+    return schema_indexes.get(config_key(DB_CONFIG)).refresh(fetch_schema_versions, load_schema_tables)
+
+def fetch_schema_fingerprint():
+    df = execute_sql_query(SCHEMA_FINGERPRINT_QUERY)
+    return tuple(df.iloc[0].tolist()) if not df.empty else None
+
+# Şema indeksi bağlantı başına önbellekte tutulur; katalog değişirse yalnızca değişen tablolar yenilenir
+def get_schema_index():
+    return schema_cache.get(config_key(DB_CONFIG), fetch_schema_fingerprint, load_schema_index)
+
+# LLM'e tüm şema yerine soruyla en ilgili tablolar, kolonlar ve join yolları gider
+def get_table_metadata(keywords=None):
+    question = " ".join(filter(None, [keywords, getattr(_chat_turn, "question", None)]))
+    return get_schema_index().search(question)
+
+def _format_stage():
+    trace = getattr(_chat_turn, "trace", None)
+    return trace.stage("format") if trace is not None else nullcontext()
+
+# Bu turun yanıtı yeniden kullanılamaz (saat, rastgele/zamana bağlı SQL, Python, çoklu veritabanı)
+def _mark_uncacheable():
+    if getattr(_chat_turn, "tables", None) is not None:
+        _chat_turn.uncacheable = True
+
+def _record_result_table(html):
+    if getattr(_chat_turn, "tables", None) is not None:
+        _chat_turn.tables.append(html)
+
+# SQL Sorgulama Aracı - LLM'e kompakt metin döner, HTML tablo yalnızca tarayıcıya gider
 def sql_query_tool(query):
-    df = execute_sql_query(query)
-    # Tablo formatında HTML döndür
-    return format_dataframe_to_html(df)
+    # Salt okunur sorgular (normalize edilmiş SQL + bağlantı) önbellekten döner
+    connection_key = config_key(DB_CONFIG)
+    cache_key = result_cache.make_key(connection_key, query)
+    if cache_key is not None:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            observation, html = cached
+            _record_result_table(html)
+            return observation
+    
+    control = getattr(_chat_turn, "control", None)
+    try:
+        df, total_rows, truncated = execute_sql_query_bounded(query, control=control)
+    except QueryRejectedError as e:
+        # Agent'ın sorguyu düzeltebilmesi için gözlem olarak döndür
+        return str(e)
+    except Exception as e:
+        from psycopg2.extensions import QueryCanceledError
+        if control is not None and control.cancelled:
+            raise RunCancelledError(str(e))
+        if isinstance(e, QueryCanceledError):
+            return (f"Query cancelled: it ran longer than the statement timeout of {SQL_STATEMENT_TIMEOUT_MS} ms. "
+                    "Add a LIMIT, a more selective WHERE filter or aggregate the data, then try again.")
+        raise
+    with _format_stage():
+        observation = format_table_compact(df, total_rows, truncated)
+        if truncated:
+            observation += "\nUse LIMIT, filters or aggregation if you need the remaining rows."
+        html = format_dataframe_to_html(df) if len(df.columns) else ""
+    _record_result_table(html)
+    
+    if cache_key is not None:
+        result_cache.put(cache_key, (observation, html), size=len(observation) + len(html))
+    else:
+        # Veriyi değiştirebilecek (ya da now()/random() gibi her çalışmada farklı) bir ifade çalıştı;
+        # bu bağlantının sorgu ve yanıt önbelleklerini boşalt, bu turun yanıtını da saklama
+        _mark_uncacheable()
+        result_cache.invalidate(connection_key)
+        answer_cache.invalidate(connection_key)
+    return observation
+
+# Çoklu veritabanı aracı girdisi: ilk satır "connections: a, b" (veya "all"), devamı SQL
+FANOUT_INPUT_PATTERN = re.compile(r'^\s*connections\s*:\s*([^\n]*)\n(.*)$', re.IGNORECASE | re.DOTALL)
+
+def parse_fan_out_input(tool_input):
+    match = FANOUT_INPUT_PATTERN.match(tool_input)
+    if not match:
+        return None, tool_input.strip()
+    # Tekrarlanan isimler sırası korunarak tek kez çalıştırılır (fan-out durumu isimle tutulur)
+    names = list(dict.fromkeys(name.strip() for name in match.group(1).split(",") if name.strip()))
+    if len(names) == 1 and names[0].lower() == "all":
+        names = None
+    return names, match.group(2).strip()
+
+# Aynı salt okunur sorguyu kayıtlı bağlantılarda paralel çalıştırır, sonuçları "source" kolonuyla birleştirir
+def fan_out_query_tool(tool_input):
+    import pandas as pd
+    from psycopg2.extensions import QueryCanceledError
+    names, sql_query = parse_fan_out_input(tool_input)
+    # Sonuç diğer bağlantıların verisine bağlıdır; yanıt önbelleğine alınmaz
+    _mark_uncacheable()
+    available = db_connections_store.names()
+    names = names or available
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        return (f"Unknown connections: {', '.join(unknown) or 'none given'}. "
+                f"Saved connections: {', '.join(available) or 'none'}.")
+    if not is_cursor_statement(sql_query):
+        return "Only read-only SELECT queries can be run on multiple databases."
+    
+    parent = getattr(_chat_turn, "control", None)
+    trace = getattr(_chat_turn, "trace", None)
+    controls = {name: RunControl() for name in names}
+    targets = [(name, db_connections_store.get(name)) for name in names]
+    
+    def run_on(name, config):
+        # İşçi thread'inde de SQL süreleri isteğin süre dökümüne yazılır
+        _chat_turn.trace = trace
+        try:
+            started = time.perf_counter()
+            df, total_rows, truncated = execute_sql_query_bounded(
+                sql_query, control=controls[name], config=config, read_only=True,
+                timeout_ms=int(FANOUT_TIMEOUT * 1000))
+            return df, total_rows, truncated, (time.perf_counter() - started) * 1000
+        finally:
+            _chat_turn.trace = None
+    
+    results = fan_out_executor.run(targets, run_on, timeout=FANOUT_TIMEOUT,
+                                   on_timeout=lambda name: controls[name].cancel(),
+                                   is_cancelled=lambda: parent is not None and parent.cancelled)
+    if parent is not None and parent.cancelled:
+        raise RunCancelledError("Request was abandoned, agent run cancelled")
+    
+    frames = []
+    status_lines = []
+    total = 0
+    truncated_any = False
+    for name, result, error in results:
+        if error is not None:
+            if isinstance(error, QueryCanceledError):
+                error = f"statement timeout of {int(FANOUT_TIMEOUT * 1000)} ms exceeded"
+            status_lines.append(f"{name}: failed - {error}")
+            continue
+        df, total_rows, truncated, elapsed_ms = result
+        status_lines.append(f"{name}: {total_rows if total_rows is not None else f'more than {len(df)}'} rows "
+                            f"in {elapsed_ms:.0f} ms")
+        if len(df.columns):
+            df.insert(0, "source", name)
+            frames.append(df)
+        total = None if total is None or total_rows is None else total + total_rows
+        truncated_any = truncated_any or truncated
+    
+    if not frames:
+        return "\n".join(["No results."] + status_lines)
+    with _format_stage():
+        merged = pd.concat(frames, ignore_index=True, sort=False)
+        observation = format_table_compact(merged, total, truncated_any)
+        _record_result_table(format_dataframe_to_html(merged))
+    return "\n".join(status_lines + [observation])
 
 def get_current_datetime(_=None):
     from datetime import datetime
+    _mark_uncacheable()
     current_time = datetime.now()
     return current_time.strftime("%Y-%m-%d %H:%M:%S")
 
-# Create agent with memory
+# Tüm oturumların agent'ları aynı LLM istemcisini ve durumsuz tool nesnelerini paylaşır
+_shared_tools = None
+_shared_lock = Lock()
+
+def get_shared_llm():
+    # Token akışı (/api/chat/stream) için streaming açık; agent.run() yine tam yanıt döner
+    with startup_timer("llm_client_ms"):
+        return llm_registry.get(LLM_CONFIG, streaming=True)
+
+# Python REPL değişkenleri çağrılar arasında kalır; oturumlar arasında paylaşılmaması için her agent'a ayrı kurulur.
+# Python çıktısı önbelleğe alınmaz; çağrı turu işaretler
+def create_python_repl_tool():
+    from langchain.agents import Tool
+    from langchain_experimental.tools import PythonREPLTool
+    repl = PythonREPLTool()
+    
+    def run_python(command):
+        _mark_uncacheable()
+        return repl.run(command)
+    
+    return Tool(name=repl.name, func=run_python, description=repl.description)
+
+def get_shared_tools():
+    global _shared_tools
+    with _shared_lock:
+        if _shared_tools is None:
+            from langchain.agents import Tool
+            _shared_tools = [
+                Tool(
+                    name="Query Database Metadata",
+                    func=get_table_metadata,
+                    description="Use this to get information about tables, columns, and their metadata. "
+                                "Input: keywords or table names related to the question. Returns the most relevant "
+                                "tables with their columns, comments and foreign key join conditions."
+                ),
+                Tool(
+                    name="Execute SQL Query",
+                    func=sql_query_tool,
+                    description="Use this to run SQL queries on the database directly. If the query is not valid, you should fix the query and try again."
+                ),
+                Tool(
+                    name="Query Multiple Databases",
+                    func=fan_out_query_tool,
+                    description="Use this to run the same read-only SELECT query on several saved database connections "
+                                "at once (e.g. regional shards with the same schema) and get one merged result with a "
+                                "'source' column. Input: first line 'connections: name1, name2' or 'connections: all', "
+                                "then the SQL query on the next lines."
+                ),
+                Tool(
+                    name="Get Current DateTime",
+                    func=get_current_datetime,
+                    description="Use this to get the current date and time."
+                )
+            ]
+        return _shared_tools
+
+# Create agent with memory - LLM ve durumsuz tool'lar paylaşılır, her oturuma yeni bir hafıza ve Python REPL kurulur
 def create_agent():
     # Yapılandırma kontrolü
     if not (AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_API_KEY and AZURE_OPENAI_DEPLOYMENT_NAME):
@@ -263,29 +596,14 @@ def create_agent():
         print("WARNING: Database yapılandırması eksik!")
         # Ya varsayılan bir agent döndürün ya da None
     
-    llm = setup_openai_llm()
-    
-    tools = [
-        Tool(
-            name="Query Database Metadata",
-            func=get_table_metadata,
-            description="Use this to get information about tables, columns, and their metadata."
-        ),
-        Tool(
-            name="Execute SQL Query",
-            func=sql_query_tool,
-            description="Use this to run SQL queries on the database directly. If the query is not valid, you should fix the query and try again."
-        ),
-        Tool(
-            name="Get Current DateTime",
-            func=get_current_datetime,
-            description="Use this to get the current date and time."
-        ),
-        PythonREPLTool()
-    ]
-    
-    #memory limit by token
-    memory = ConversationBufferMemory(memory_key="chat_history",return_messages=True, max_token_limit=5000)
+    from langchain.agents import initialize_agent
+    from chat_memory import TokenBudgetMemory
+    
+    llm = get_shared_llm()
+    tools = get_shared_tools() + [create_python_repl_tool()]
+    
+    # Gerçek token bütçeli hafıza: hacimli içerik atılır, eski turlar kısa bir özete taşınır
+    memory = TokenBudgetMemory(memory_key="chat_history", return_messages=True)
 
     system_message = """You are a helpful SQL assistant specialized in querying PostgreSQL databases.
     
@@ -295,7 +613,7 @@ def create_agent():
     2. Write clean, optimized SQL queries
     3. Explain your reasoning before executing queries
     4. If you get an error in a query, explain what went wrong and fix it
-    5. Format query results will be automatically formatted as HTML tables
+    5. Query results are automatically shown to the user as HTML tables. Do not repeat the whole result in your answer, summarize it
     6. If the user query the database, use the Execute SQL Query tool and return the results. SQL Query should be valid and optimized for PostgreSQL.
     7. If the user asks for the current date and time, use the Get Current DateTime tool.
     8. For listed information, ALWAYS use proper formatting with Markdown:
@@ -306,6 +624,7 @@ def create_agent():
        - Format SQL queries with proper indentation
     9. DO NOT use commas or semicolons to separate list items horizontally - always use vertical lists
     10. When showing multiple options or items, ALWAYS format them as a vertical list, never in a horizontal line
+    11. If the question spans several saved databases (e.g. totals across regions), use the Query Multiple Databases tool once instead of querying each database separately
     
     You are an expert in PostgreSQL and SQL query optimization. Your task is to generate a **valid and optimized SQL query** based on the user's request...
     """
@@ -326,8 +645,25 @@ def create_agent():
     
     return agent
 
-# Global agent instance
-agent = create_agent()
+# İlk agent kurulumu langchain importlarını da içerir; süresi başlangıç raporuna eklenir
+def create_agent_timed():
+    if "first_agent_ms" in STARTUP_TIMINGS:
+        return create_agent()
+    with startup_timer("first_agent_ms"):
+        return create_agent()
+
+# Oturum bazlı agent kayıt defteri (LRU + boşta kalma süresiyle temizlenir)
+agent_registry = AgentRegistry(create_agent_timed)
+
+# Flask oturumuna ait sohbet kimliği
+def get_chat_session_id():
+    if "chat_session_id" not in session:
+        session["chat_session_id"] = uuid.uuid4().hex
+    return session["chat_session_id"]
+
+@app.before_request
+def ensure_initialized():
+    initialize_app()
 
 @app.route('/')
 def home():
@@ -339,6 +675,97 @@ def home():
                           llm_config_valid=llm_config_valid, 
                           db_config_valid=db_config_valid)
 
+# Agent'ı çalıştırır; yanıt metnini ve son sorgunun HTML tablosunu (varsa) döndürür
+def run_chat_agent(session_id, user_message, callbacks=None, cache_key=None, control=None, trace=None):
+    _chat_turn.tables = []
+    _chat_turn.control = control
+    _chat_turn.question = user_message
+    _chat_turn.trace = trace
+    _chat_turn.uncacheable = False
+    callbacks = list(callbacks or [])
+    if trace is not None:
+        from trace_events import TraceCallbackHandler
+        # Kuyrukta bekleme süresi: istek başlangıcından worker'ın işi almasına kadar
+        trace.add_stage("queue", trace.elapsed_ms())
+        callbacks.append(TraceCallbackHandler(trace))
+    try:
+        # Çalıştırma süresince agent'ın LLM istemcisi, model değişse de kapatılmaz
+        with llm_registry.run(), agent_registry.session(session_id) as agent:
+            # Önceki turlara bağlı yanıtlar başka oturumlara verilmemeli
+            if cache_key is not None and has_chat_history(agent):
+                cache_key = None
+            response = agent.run(user_message, callbacks=callbacks)
+        tables = [html for html in _chat_turn.tables if html]
+        result = (response, tables[-1] if tables else "")
+        if cache_key is not None and not _chat_turn.uncacheable:
+            answer_cache.put(cache_key, result)
+        return result
+    finally:
+        _chat_turn.tables = None
+        _chat_turn.control = None
+        _chat_turn.question = None
+        _chat_turn.trace = None
+        _chat_turn.uncacheable = None
+
+# Aynı veritabanı ve modelde tekrarlanan sorular LLM çağrılmadan önbellekten yanıtlanır.
+# İstek {"use_cache": false} veya "Cache-Control: no-cache" ile önbelleği atlayabilir.
+def get_answer_cache_key(data, user_message):
+    if data.get('use_cache', True) is False or 'no-cache' in request.headers.get('Cache-Control', ''):
+        answer_cache.skip()
+        return None
+    return answer_cache.make_key(user_message, config_key(DB_CONFIG), llm_config_key(LLM_CONFIG))
+
+# Oturumda önceki turlar (ya da özetleri) varsa soru bağlama bağlı olabilir ("ya geçen ay?")
+def has_chat_history(agent):
+    memory = agent.memory
+    return bool(memory.chat_memory.messages or memory.summary or memory.omitted_turns)
+
+# İstek thread'inde agent kurulmaz ve meşgul bir oturum beklenmez; önbellek yalnızca
+# kayıt defterinde zaten bulunan agent'ın hafızasına bakar
+def get_cached_answer(session_id, user_message, cache_key):
+    if cache_key is None:
+        return None
+    with agent_registry.existing(session_id) as agent:
+        # Yalnızca boş hafızalı oturumlar önbellekten yanıtlanır; devam soruları agent'a gider
+        if has_chat_history(agent) if agent is not None else agent_registry.is_active(session_id):
+            answer_cache.skip()
+            return None
+        cached = answer_cache.get(cache_key)
+        if cached is None:
+            return None
+        # Soru-cevap oturum hafızasına da eklenir; devam soruları bağlamı kaybetmez.
+        # Agent henüz yoksa tur, agent ilk kurulduğunda hafızaya yazılır
+        def save_turn(session_agent):
+            session_agent.memory.save_context({"input": user_message}, {"output": cached[0]})
+        if agent is not None:
+            save_turn(agent)
+        else:
+            agent_registry.remember(session_id, save_turn)
+    return cached
+
+# Kuyruk doluysa hemen 429 dön; istemci Retry-After süresi sonra tekrar denesin
+def too_many_requests(error):
+    response = jsonify({"error": "Server is busy, please try again shortly", "retry_after": error.retry_after})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+# Süre dökümü istenmişse (X-Request-Timing: 1 veya METRICS_TIMING_HEADER) Server-Timing başlığı eklenir
+def wants_timing():
+    return METRICS_TIMING_HEADER or request.headers.get("X-Request-Timing") == "1"
+
+def traced_response(response, trace, status="ok"):
+    trace.response_bytes = response.calculate_content_length() or 0
+    trace.finish(status)
+    if wants_timing():
+        response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", 5))  # saniye
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     data = request.json
@@ -347,83 +774,145 @@ def chat():
     if not user_message:
         return jsonify({"error": "No message provided"}), 400
     
+    trace = RequestTrace("chat")
     try:
-        # Agent'ı çağır (Lazy loading kullanılıyorsa get_agent() ile)
-        # agent = get_agent() 
-        response = agent.run(user_message) # Agent'ın çalıştığını varsayıyoruz
+        session_id = get_chat_session_id()
+        cache_key = get_answer_cache_key(data, user_message)
+        cached = get_cached_answer(session_id, user_message, cache_key)
+        if cached is not None:
+            trace.cached = True
+            response, result_table = cached
+            return traced_response(jsonify({"response": render_response(response) + result_table, "cached": True}), trace)
         
-        # --- Yanıt Formatlama Başlangıcı ---
-        
-        # 1. Markdown tarzı listeleri (-, *, 1.) HTML listelerine çevir
-        formatted_response = ""
-        in_list = False
-        list_type = None # 'ul' or 'ol'
+        # Oturuma ait agent'ı sınırlı worker havuzunda çalıştır - farklı kullanıcılar paralel çalışır
+        from streaming_events import CancellationHandler
+        control = RunControl()
+        future = agent_executor.submit(run_chat_agent, session_id, user_message,
+                                       callbacks=[CancellationHandler(control)],
+                                       cache_key=cache_key, control=control, trace=trace)
+        try:
+            response, result_table = future.result(timeout=AGENT_RUN_TIMEOUT)
+        except FutureTimeoutError:
+            # İstek zaman aşımına uğradı; çalışan sorgu hemen, agent bir sonraki LLM/tool adımında durur
+            control.cancel()
+            response = jsonify({"error": f"The request did not finish within {AGENT_RUN_TIMEOUT:g} seconds "
+                                         "and was cancelled. Try a more specific question."})
+            response.status_code = 504
+            return traced_response(response, trace, "timeout")
         
-        lines = response.strip().split('\n')
-        processed_lines = []
-
-        for line in lines:
-            line = line.strip()
-            
-            # Markdown listesi başlangıcı kontrolü
-            ul_match = re.match(r'^[-*]\s+(.*)', line)
-            ol_match = re.match(r'^\d+\.\s+(.*)', line)
-
-            if ul_match:
-                item_content = ul_match.group(1).strip()
-                if not in_list or list_type != 'ul':
-                    if in_list: # Önceki listeyi kapat
-                        processed_lines.append(f'</{list_type}>')
-                    processed_lines.append('<ul>')
-                    in_list = True
-                    list_type = 'ul'
-                processed_lines.append(f'<li>{item_content}</li>')
-            elif ol_match:
-                item_content = ol_match.group(1).strip()
-                if not in_list or list_type != 'ol':
-                    if in_list: # Önceki listeyi kapat
-                        processed_lines.append(f'</{list_type}>')
-                    processed_lines.append('<ol>')
-                    in_list = True
-                    list_type = 'ol'
-                processed_lines.append(f'<li>{item_content}</li>')
-            else:
-                # Liste bittiyse kapat
-                if in_list:
-                    processed_lines.append(f'</{list_type}>')
-                    in_list = False
-                
-                # Normal satırları <p> içine alabiliriz (isteğe bağlı)
-                if line: # Boş satırları atla
-                   processed_lines.append(f'<p>{line}</p>')
-
-        # Döngü bittiğinde açık liste varsa kapat
-        if in_list:
-            processed_lines.append(f'</{list_type}>')
-            
-        formatted_response = "".join(processed_lines)
-
-        # 2. Virgül/Noktalı virgül ile ayrılmış yatay listeleri dikey yap (Ekstra kontrol)
-        # Bu kısım çok agresif olabilir, gerekirse kaldırın veya düzenleyin
-        # formatted_response = formatted_response.replace(', ', '<br>- ')
-        # formatted_response = formatted_response.replace('; ', '<br>- ')
+        with trace.stage("format"):
+            formatted_response = render_response(response) + result_table
 
-        # 3. Satır sonlarını <br> ile değiştir (Paragraflar arası boşluk için)
-        # formatted_response = formatted_response.replace('\n', '<br>') # <p> kullandığımız için buna gerek kalmayabilir
-
-        # --- Yanıt Formatlama Sonu ---
-
-        return jsonify({"response": formatted_response})
+        return traced_response(jsonify({"response": formatted_response}), trace)
         
+    except QueueFullError as e:
+        return traced_response(too_many_requests(e), trace, "rejected")
     except Exception as e:
         print(f"Chat Error: {str(e)}") # Hata loglamayı iyileştir
-        return jsonify({"error": str(e)}), 500
+        response = jsonify({"error": str(e)})
+        response.status_code = 500
+        return traced_response(response, trace, "error")
+
+# Server-sent events ile akışlı sohbet: ara adımlar ve son yanıt token'ları geldikçe gönderilir
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    from streaming_events import StreamingEventHandler
+    
+    data = request.json
+    user_message = data.get('message', '')
+    
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
+    
+    trace = RequestTrace("chat_stream")
+    session_id = get_chat_session_id()
+    cache_key = get_answer_cache_key(data, user_message)
+    try:
+        cached = get_cached_answer(session_id, user_message, cache_key)
+    except Exception as e:
+        response = jsonify({"error": str(e)})
+        response.status_code = 500
+        return traced_response(response, trace, "error")
+    if cached is not None:
+        trace.cached = True
+        response, result_table = cached
+        return traced_response(
+            Response(sse_event("done", {"response": render_response(response) + result_table, "cached": True}),
+                     mimetype="text/event-stream", headers={"Cache-Control": "no-cache"}),
+            trace)
+    
+    events = queue.Queue()
+    control = RunControl()
+    # Akışta başlıklar en başta gider; süre dökümü "done" olayına eklenir
+    include_timings = wants_timing()
+    
+    def run_agent():
+        try:
+            events.put(("done", run_chat_agent(session_id, user_message,
+                                               callbacks=[StreamingEventHandler(events, control)],
+                                               cache_key=cache_key, control=control, trace=trace)))
+        except Exception as e:
+            print(f"Chat Error: {str(e)}")
+            events.put(("error", str(e)))
+        finally:
+            events.put(None)
+    
+    try:
+        agent_executor.submit(run_agent)
+    except QueueFullError as e:
+        return traced_response(too_many_requests(e), trace, "rejected")
+    
+    def send(chunk):
+        trace.response_bytes += len(chunk.encode())
+        return chunk
+    
+    def generate():
+        renderer = ResponseRenderer()
+        finished = False
+        status = "cancelled"
+        try:
+            while True:
+                try:
+                    item = events.get(timeout=SSE_HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    # Bağlantı koptuysa yazma hatası generator'ı kapatır ve çalışma iptal edilir
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    finished = True
+                    break
+                event, payload = item
+                if event == "token":
+                    with trace.stage("format"):
+                        chunk = sse_event("token", {"html": renderer.feed(payload), "pending": renderer.pending})
+                    yield send(chunk)
+                elif event == "done":
+                    # Son yanıtın tamamı biçimlendirilerek gönderilir; istemci akışla gelen içeriği bununla değiştirir
+                    response, result_table = payload
+                    with trace.stage("format"):
+                        done = {"response": render_response(response) + result_table}
+                    status = "ok"
+                    if include_timings:
+                        done["timings"] = trace.timings()
+                    yield send(sse_event("done", done))
+                elif event == "error":
+                    status = "error"
+                    yield send(sse_event("error", {"error": payload}))
+                else:
+                    yield send(sse_event(event, payload))
+        finally:
+            if not finished:
+                # İstemci akışı yarıda bıraktı; agent'ı ve çalışan SQL sorgusunu durdur
+                control.cancel()
+            trace.finish(status)
+    
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.route('/api/clear_chat', methods=['POST'])
 def clear_chat():
-    global agent
-    # Yeni bir agent oluşturarak hafızayı sıfırla
-    agent = create_agent()
+    # Yalnızca bu oturumun agent'ını bırak; bir sonraki mesajda boş hafızayla yeniden oluşturulur
+    agent_registry.discard(get_chat_session_id())
     return jsonify({"status": "success", "message": "Chat history cleared"})
 
 @app.route('/api/connect_database', methods=['POST'])
@@ -433,6 +922,7 @@ def connect_database():
         
         # Yeni bağlantı bilgilerini al
         global DB_CONFIG
+        old_config = DB_CONFIG
         DB_CONFIG = {
             "host": data.get('host'),
             "name": data.get('name'),
@@ -442,13 +932,11 @@ def connect_database():
             "sslmode": data.get('sslmode', 'require')
         }
         
-        # Bağlantıyı test et
-        connection = setup_postgresql_connection()
-        connection.close()
+        # Havuzu yeni veritabanı için kur (bağlantı testi de burada yapılır), önbellekleri temizle
+        switch_database(old_config)
         
-        # Bağlantı başarılı olursa, agent'ı yeniden başlat
-        global agent
-        agent = create_agent()
+        # Bağlantı başarılı olursa, tüm oturumların agent'larını yeniden başlat
+        agent_registry.clear()
         
         return jsonify({"status": "success", "message": "Database connection successful"})
     except Exception as e:
@@ -457,19 +945,13 @@ def connect_database():
 # API endpoint: Kayıtlı bağlantıları listele - Debug eklenmiş
 @app.route('/api/db_connections', methods=['GET'])
 def get_db_connections():
-    global DB_CONNECTIONS
-    # Dosyadan yeniden yükle ki dosya manuel değiştiyse de görelim
-    DB_CONNECTIONS = load_db_connections()
-    connections_list = list(DB_CONNECTIONS.keys())
-    print(f"Serving connections list: {connections_list}")
-    return jsonify({"connections": connections_list})
+    # Bellekten döner; dosya manuel değiştiyse kayıt deposu mtime ile fark edip yeniden okur
+    return jsonify({"connections": db_connections_store.names()})
 
 # API endpoint: Bağlantı bilgilerini kaydet
 @app.route('/api/save_connection', methods=['POST'])
 def save_connection():
     try:
-        global DB_CONFIG
-        
         data = request.json
         connection_name = data.get('name')
         
@@ -477,9 +959,6 @@ def save_connection():
         if not connection_name:
             return jsonify({"status": "error", "message": "Connection name is required"}), 400
         
-        # Geçici değişkeni try bloğunun başında tanımlayın
-        temp_config = DB_CONFIG.copy()
-        
         connection_config = {
             "host": data.get('host'),
             "name": data.get('dbName'),
@@ -489,21 +968,15 @@ def save_connection():
             "sslmode": data.get('sslmode', 'require')
         }
         
-        # Bağlantıyı test et
-        DB_CONFIG = connection_config
-        connection = setup_postgresql_connection()
+        # Bağlantıyı test et - aktif veritabanı (DB_CONFIG) değişmez; geçmek için /api/load_connection kullanılır
+        connection = connect(connection_config)
         connection.close()
         
         # Bağlantı başarılı ise kaydet
         save_db_connection(connection_name, connection_config)
-        global DB_CONNECTIONS
-        DB_CONNECTIONS = load_db_connections()
         
         return jsonify({"status": "success", "message": "Connection saved successfully"})
     except Exception as e:
-        # Hata durumunda orijinal config'e dön (eğer temp_config tanımlandıysa)
-        if 'temp_config' in locals():
-            DB_CONFIG = temp_config
         return jsonify({"status": "error", "message": str(e)}), 500
 
 # API endpoint: Kaydedilmiş bağlantıyı yükle
@@ -511,23 +984,23 @@ def save_connection():
 def load_connection():
     try:
         global DB_CONFIG  # Global tanımlamasını fonksiyonun başına taşıyın
-        global agent      # Bu da önemli
         
         data = request.json
         connection_name = data.get('name')
         
-        if connection_name not in DB_CONNECTIONS:
+        connection_config = db_connections_store.get(connection_name)
+        if connection_config is None:
             return jsonify({"status": "error", "message": "Connection not found"}), 404
         
         # Bağlantı bilgilerini yükle
-        DB_CONFIG = DB_CONNECTIONS[connection_name]
+        old_config = DB_CONFIG
+        DB_CONFIG = connection_config
         
-        # Test et
-        connection = setup_postgresql_connection()
-        connection.close()
+        # Havuzu yeniden kur ve test et, eski veritabanının havuzunu ve önbelleklerini boşalt
+        switch_database(old_config)
         
-        # Agent'ı yeniden başlat
-        agent = create_agent()
+        # Agent'ları yeniden başlat
+        agent_registry.clear()
         
         return jsonify({"status": "success", "message": "Connection loaded successfully"})
     except Exception as e:
@@ -536,14 +1009,13 @@ def load_connection():
 # API endpoint: Kayıtlı dil modellerini listele
 @app.route('/api/llm_models', methods=['GET'])
 def get_llm_models():
-    return jsonify({"models": list(LLM_MODELS.keys())})
+    return jsonify({"models": llm_models_store.names()})
 
 # API endpoint: Dil modeli bilgilerini kaydet - Güncelleme
 @app.route('/api/save_llm_model', methods=['POST'])
 def save_llm_model_endpoint():
     try:
         global LLM_CONFIG
-        global LLM_MODELS  # Global tanımlamasını fonksiyonun başına taşıdık
         global ACTIVE_MODEL_NAME  # Bunu da ekledik
         
         data = request.json
@@ -566,16 +1038,22 @@ def save_llm_model_endpoint():
         }
         
         try:
-            # Modeli test et
+            # Basit bir test mesajı göndererek hata kontrolü yap - istemci kayıt defterinde kalır ve yeniden kullanılır.
+            # LLM_CONFIG test başarılı olana kadar değişmez; bu arada kurulan agent'lar test edilmemiş istemciyi almaz
+            llm_registry.warm_up(model_config)
             LLM_CONFIG = model_config
-            test_llm = setup_openai_llm()
             
-            # Basit bir test mesajı göndererek hata kontrolü yap
-            test_llm.invoke("Hello, are you working?")
+            # Aynı isimli model farklı ayarlarla değiştirildiyse eski istemciyi bırak
+            previous_config = get_llm_model_config(model_name)
+            if previous_config and llm_config_key(previous_config) != llm_config_key(model_config):
+                # Eski istemciyi kullanan agent'lar önce bırakılır, yenileri güncel istemciyle kurulur.
+                # Eski bağlantı havuzu, daha önce başlamış çalıştırmalar bitince kapanır
+                if llm_registry.serves_agents(previous_config):
+                    agent_registry.clear()
+                llm_registry.evict(previous_config)
             
             # Model başarılı ise kaydet
             save_llm_model(model_name, model_config, is_default)
-            LLM_MODELS = load_llm_models()  # Global tanımlamayı yukarıya taşıdık
             
             # Eğer varsayılan olarak işaretlendiyse, aktif model olarak da ayarla
             if is_default:
@@ -598,31 +1076,27 @@ def save_llm_model_endpoint():
 def load_llm_model():
     try:
         global LLM_CONFIG
-        global agent
         global ACTIVE_MODEL_NAME
-        global LLM_MODELS  # Bu satır eksikti - global tanımlaması eklendi
         
         data = request.json
         model_name = data.get('name')
         set_as_default = data.get('set_as_default', False)
         
-        if model_name not in LLM_MODELS:
-            return jsonify({"status": "error", "message": "Model not found"}), 404
-        
         # Model bilgilerini yükle - Hem eski hem de yeni format için kontrol
-        model_data = LLM_MODELS[model_name]
-        LLM_CONFIG = model_data["config"] if isinstance(model_data, dict) and "config" in model_data else model_data
+        model_config = get_llm_model_config(model_name)
+        if model_config is None:
+            return jsonify({"status": "error", "message": "Model not found"}), 404
+        LLM_CONFIG = model_config
         
         # Eğer varsayılan olarak ayarlanması istendiyse
         if set_as_default:
             save_llm_model(model_name, LLM_CONFIG, is_default=True)
-            LLM_MODELS = load_llm_models()
         
         # Aktif model adını güncelle
         ACTIVE_MODEL_NAME = model_name
         
-        # Agent'ı yeniden başlat
-        agent = create_agent()
+        # Agent'ları yeni modelin (paylaşılan) istemcisiyle yeniden başlat
+        agent_registry.clear()
         
         return jsonify({"status": "success", "message": "Model loaded successfully"})
     except Exception as e:
@@ -634,6 +1108,35 @@ def load_llm_model():
 def get_active_model():
     return jsonify({"name": ACTIVE_MODEL_NAME})
 
+# Agent kuyruğu ve önbellek istatistikleri
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    return jsonify({
+        "agent_executor": agent_executor.stats(),
+        "agent_registry": agent_registry.stats(),
+        "llm_registry": llm_registry.stats(),
+        "db_pool": db_pool.stats(),
+        "fan_out": fan_out_executor.stats(),
+        "schema_cache": schema_cache.stats(),
+        "schema_indexes": schema_indexes.stats(),
+        "result_cache": result_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "config_store": {
+            "llm_models": llm_models_store.stats(),
+            "db_connections": db_connections_store.stats()
+        }
+    })
+
+# Prometheus metrikleri: istek, aşama (LLM/tool/SQL/biçimlendirme), token ve SQL histogramları
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+# Başlangıç süreleri raporu
+@app.route('/api/startup', methods=['GET'])
+def get_startup_report():
+    return jsonify(STARTUP_TIMINGS)
+
 # Yapılandırma durumunu kontrol eden API endpoint
 @app.route('/api/config_status', methods=['GET'])
 def config_status():
@@ -645,8 +1148,10 @@ def config_status():
         "db_config_valid": db_config_valid
     })
 
+STARTUP_TIMINGS["module_import_ms"] = round((time.perf_counter() - _MODULE_IMPORT_STARTED) * 1000, 1)
+print(f"App module imported in {STARTUP_TIMINGS['module_import_ms']} ms")
+
 if __name__ == '__main__':
     initialize_connections_file()
     add_test_connection()  # Test için
-    agent = create_agent()
     app.run(debug=True)
\ No newline at end of file
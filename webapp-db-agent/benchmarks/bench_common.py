@@ -0,0 +1,33 @@
+"""Shared command line options and statistics for the benchmark scripts."""
+import math
+import os
+
+
+def add_db_arguments(parser):
+    group = parser.add_argument_group("database")
+    group.add_argument("--db-host", default=os.getenv("BENCH_DB_HOST", "localhost"))
+    group.add_argument("--db-port", type=int, default=int(os.getenv("BENCH_DB_PORT", 5432)))
+    group.add_argument("--db-name", default=os.getenv("BENCH_DB_NAME", "agent_bench"))
+    group.add_argument("--db-user", default=os.getenv("BENCH_DB_USER", "postgres"))
+    group.add_argument("--db-password", default=os.getenv("BENCH_DB_PASSWORD", "postgres"))
+    group.add_argument("--db-sslmode", default=os.getenv("BENCH_DB_SSLMODE", "disable"))
+
+
+def db_config_from_args(args):
+    # app.py DB_CONFIG biçimi
+    return {
+        "host": args.db_host,
+        "name": args.db_name,
+        "user": args.db_user,
+        "password": args.db_password,
+        "port": args.db_port,
+        "sslmode": args.db_sslmode,
+    }
+
+
+def percentile(sorted_values, fraction):
+    """Sıralı listede en yakın sıra (nearest-rank) yöntemiyle yüzdelik."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
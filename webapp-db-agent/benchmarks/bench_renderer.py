@@ -0,0 +1,118 @@
+"""
+Micro-benchmark and correctness check for response_renderer.
+
+Compares the renderer with the original /api/chat formatting loop on large
+answers with many lists, mixed paragraphs and an embedded HTML table, both for
+whole-text rendering and for token-sized streaming input.
+
+    python benchmarks/bench_renderer.py [--repeat 20]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_renderer import ResponseRenderer, render_response  # noqa: E402
+
+
+# /api/chat içindeki eski biçimlendirme döngüsü (referans)
+def legacy_format(response):
+    in_list = False
+    list_type = None
+    processed_lines = []
+    for line in response.strip().split('\n'):
+        line = line.strip()
+        ul_match = re.match(r'^[-*]\s+(.*)', line)
+        ol_match = re.match(r'^\d+\.\s+(.*)', line)
+        if ul_match:
+            item_content = ul_match.group(1).strip()
+            if not in_list or list_type != 'ul':
+                if in_list:
+                    processed_lines.append(f'</{list_type}>')
+                processed_lines.append('<ul>')
+                in_list = True
+                list_type = 'ul'
+            processed_lines.append(f'<li>{item_content}</li>')
+        elif ol_match:
+            item_content = ol_match.group(1).strip()
+            if not in_list or list_type != 'ol':
+                if in_list:
+                    processed_lines.append(f'</{list_type}>')
+                processed_lines.append('<ol>')
+                in_list = True
+                list_type = 'ol'
+            processed_lines.append(f'<li>{item_content}</li>')
+        else:
+            if in_list:
+                processed_lines.append(f'</{list_type}>')
+                in_list = False
+            if line:
+                processed_lines.append(f'<p>{line}</p>')
+    if in_list:
+        processed_lines.append(f'</{list_type}>')
+    return "".join(processed_lines)
+
+
+SAMPLE_LINES = [
+    "- Sipariş durumu: Kargoda",
+    "* Müşteri sayısı: 42",
+    "1. İlk adım",
+    "12.  Onikinci adım ",
+    "Toplam 1.250 sipariş bulundu.",
+    "",
+    "   ",
+    "  - girintili madde",
+    "-bitişik tire liste değil",
+    "3.5 ondalık sayı liste değil",
+    "<table class=\"table\"><tr><td>1</td><td>Kargoda</td></tr></table>",
+]
+
+
+def make_response(lines, seed=0):
+    rng = random.Random(seed)
+    return "\n".join(rng.choice(SAMPLE_LINES) for _ in range(lines))
+
+
+def stream(text, chunk_size):
+    renderer = ResponseRenderer()
+    parts = [renderer.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size)]
+    parts.append(renderer.close())
+    return "".join(parts)
+
+
+def check_correctness(cases=2000):
+    rng = random.Random(1)
+    for seed in range(cases):
+        text = make_response(rng.randint(0, 30), seed)
+        expected = legacy_format(text)
+        assert render_response(text) == expected, text
+        assert stream(text.strip(), rng.randint(1, 8)) == expected, text
+    print(f"correctness: {cases} random responses match the legacy formatter (whole and streamed)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    check_correctness()
+
+    text = make_response(args.lines)
+    results = {
+        "legacy": lambda: legacy_format(text),
+        "render_response": lambda: render_response(text),
+        "streamed (4-char chunks)": lambda: stream(text.strip(), 4),
+    }
+    print(f"{args.lines} lines, {len(text)} chars, best of {args.repeat}:")
+    for name, fn in results.items():
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"  {name:<26} {best * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
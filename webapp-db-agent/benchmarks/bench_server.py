@@ -0,0 +1,65 @@
+"""
+Runs app.py against a seeded benchmark database with ScriptedChatModel in place
+of Azure OpenAI.
+
+Model and connection files are written to a temporary directory, so the real
+llm_models.json / db_connections.json are left untouched.
+
+    python benchmarks/bench_server.py --port 5055 --llm-latency-ms 400 --token-latency-ms 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_common import add_db_arguments, db_config_from_args  # noqa: E402
+
+
+def build_app(args):
+    import app as webapp
+    from config_store import JsonConfigStore
+    from fake_llm import ScriptedChatModel
+    from llm_registry import LLMClientRegistry
+
+    workdir = tempfile.mkdtemp(prefix="agent-bench-")
+    webapp.llm_models_store = JsonConfigStore(os.path.join(workdir, "llm_models.json"))
+    webapp.db_connections_store = JsonConfigStore(os.path.join(workdir, "db_connections.json"))
+    webapp.initialize_app()
+
+    def scripted_llm(config, streaming=False, http_client=None):
+        return ScriptedChatModel(streaming=streaming, latency_ms=args.llm_latency_ms,
+                                 token_latency_ms=args.token_latency_ms)
+
+    # Paylaşılan LLM kayıt defteri üzerinden tüm agent'lar sahte modeli kullanır
+    webapp.llm_registry = LLMClientRegistry(scripted_llm)
+    old_config = webapp.DB_CONFIG
+    webapp.DB_CONFIG = db_config_from_args(args)
+    webapp.switch_database(old_config)
+    return webapp.app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_db_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="delay before every LLM response")
+    parser.add_argument("--token-latency-ms", type=float, default=0.0, help="delay per generated token")
+    args = parser.parse_args()
+
+    from werkzeug.serving import make_server
+
+    server = make_server(args.host, args.port, build_app(args), threaded=True)
+    print(f"benchmark server listening on http://{args.host}:{args.port} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Deterministic chat model for offline benchmarks.
+
+ScriptedChatModel replays scripted ReAct traces for the conversational agent
+used by app.py: the question after the last "New input:" in the prompt selects
+a scenario, and the number of observations already in the scratchpad selects
+the step. Latency per call and per streamed token is configurable, so runs are
+repeatable without Azure OpenAI.
+"""
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Her senaryo: (tool, girdi) adımları ve son yanıt. Sorgular db_script.sql şemasına göre yazılmıştır.
+SCENARIOS = {
+    "How many orders are there per status?": {
+        "steps": [
+            ("Execute SQL Query",
+             "SELECT status, count(*) AS order_count FROM orders GROUP BY status ORDER BY order_count DESC"),
+        ],
+        "answer": "Orders per status:\n- The table above lists every status with its order count.",
+    },
+    "Who are the top 5 customers by total spending?": {
+        "steps": [
+            ("Query Database Metadata", "customers orders"),
+            ("Execute SQL Query",
+             "SELECT c.customer_id, c.first_name, c.last_name, sum(o.total_amount) AS total_spent "
+             "FROM customers c JOIN orders o ON o.customer_id = c.customer_id "
+             "GROUP BY c.customer_id, c.first_name, c.last_name ORDER BY total_spent DESC LIMIT 5"),
+        ],
+        "answer": "The top 5 customers by total spending:\n1. See the first row of the table\n2. And so on",
+    },
+    "What is the monthly revenue for 2023?": {
+        "steps": [
+            ("Execute SQL Query",
+             "SELECT date_trunc('month', order_date) AS month, sum(total_amount) AS revenue FROM orders "
+             "WHERE order_date >= '2023-01-01' AND order_date < '2024-01-01' GROUP BY 1 ORDER BY 1"),
+        ],
+        "answer": "Monthly revenue for 2023 is shown in the table.\n- Revenue is the sum of order totals",
+    },
+    "Which products are low on stock?": {
+        "steps": [
+            ("Query Database Metadata", "products stock"),
+            ("Execute SQL Query",
+             "SELECT product_id, product_name, stock_quantity FROM products "
+             "WHERE stock_quantity < 20 ORDER BY stock_quantity"),
+        ],
+        "answer": "These products have fewer than 20 units in stock:\n- See the table for details",
+    },
+    "Which categories sell the most units?": {
+        "steps": [
+            ("Query Database Metadata", "categories products order items quantity"),
+            ("Execute SQL Query",
+             "SELECT cat.category_name, sum(oi.quantity) AS units FROM order_items oi "
+             "JOIN products p ON p.product_id = oi.product_id "
+             "JOIN categories cat ON cat.category_id = p.category_id "
+             "GROUP BY cat.category_name ORDER BY units DESC"),
+        ],
+        "answer": "Units sold per category:\n- The first row is the best selling category",
+    },
+    "What time is it now?": {
+        "steps": [("Get Current DateTime", "now")],
+        "answer": "The current date and time is shown above.",
+    },
+}
+
+DEFAULT_SCENARIO = {
+    "steps": [("Execute SQL Query", "SELECT count(*) AS order_count FROM orders")],
+    "answer": "There are this many orders in total.",
+}
+
+# Yük sürücüsü aynı soruyu önbelleği atlatmak için "(#n)" ekiyle gönderebilir
+_QUESTION_SUFFIX_PATTERN = re.compile(r"\s*\(#\d+\)$")
+_TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+def scenario_for(question):
+    return SCENARIOS.get(_QUESTION_SUFFIX_PATTERN.sub("", question.strip()), DEFAULT_SCENARIO)
+
+
+def scripted_reply(prompt):
+    """Prompt'taki son soruya ve şu ana kadarki gözlem sayısına göre bir sonraki ReAct adımı."""
+    index = prompt.rfind("New input:")
+    if index == -1:
+        return "Thought: Do I need to use a tool? No\nAI: Hello from the benchmark model."
+    question, _, scratchpad = prompt[index + len("New input:"):].partition("\n")
+    scenario = scenario_for(question)
+    step = scratchpad.count("Observation:")
+    if step < len(scenario["steps"]):
+        tool, tool_input = scenario["steps"][step]
+        return f"Thought: Do I need to use a tool? Yes\nAction: {tool}\nAction Input: {tool_input}"
+    return f"Thought: Do I need to use a tool? No\nAI: {scenario['answer']}"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that answers from SCENARIOS with a fixed, configurable latency."""
+    streaming: bool = False
+    latency_ms: float = 0.0        # çağrı başına (ilk token öncesi) gecikme
+    token_latency_ms: float = 0.0  # akışta token başına gecikme
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-react"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"latency_ms": self.latency_ms, "token_latency_ms": self.token_latency_ms}
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return scripted_reply("\n".join(str(message.content) for message in messages))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.streaming:
+            return generate_from_stream(self._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+        text = self._reply(messages)
+        if self.token_latency_ms:
+            time.sleep(len(_TOKEN_PATTERN.findall(text)) * self.token_latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for token in _TOKEN_PATTERN.findall(self._reply(messages)):
+            if self.token_latency_ms:
+                time.sleep(self.token_latency_ms / 1000)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
@@ -0,0 +1,250 @@
+"""
+Load driver for /api/chat and /api/chat/stream.
+
+Every worker is one chat user (own session cookie) sending the benchmark
+questions from fake_llm.SCENARIOS. Reports p50/p95/p99 latency, throughput,
+errors and the peak RSS of the server process; with --json the report is
+written to a file and --baseline prints the change against an earlier report.
+
+Typical offline run:
+
+    python benchmarks/seed_fixtures.py --orders 100000
+    python benchmarks/load_driver.py --spawn-server --concurrency 8 --requests 400 \\
+        --server-args "--llm-latency-ms 300 --token-latency-ms 2" --json report.json
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import resource
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from bench_common import add_db_arguments, percentile
+from fake_llm import SCENARIOS
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Result:
+    __slots__ = ("latency", "first_event", "status", "cached", "error")
+
+    def __init__(self, latency, status, first_event=None, cached=False, error=None):
+        self.latency = latency
+        self.first_event = first_event
+        self.status = status
+        self.cached = cached
+        self.error = error
+
+
+def send(opener, url, question, stream, use_cache, timeout):
+    body = json.dumps({"message": question, "use_cache": use_cache}).encode()
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    started = time.perf_counter()
+    try:
+        with opener.open(request, timeout=timeout) as response:
+            first_event = None
+            cached = False
+            if stream:
+                # İlk olay (tool_start/token/done) gelene kadar geçen süre algılanan gecikmedir
+                for line in response:
+                    if first_event is None and line.startswith(b"event:"):
+                        first_event = time.perf_counter() - started
+                    if line.startswith(b"event: error"):
+                        return Result(time.perf_counter() - started, "error", first_event, error="stream error")
+                    if line.startswith(b"data:") and b'"cached": true' in line:
+                        cached = True
+            else:
+                cached = bool(json.loads(response.read()).get("cached"))
+            return Result(time.perf_counter() - started, response.status, first_event, cached)
+    except urllib.error.HTTPError as e:
+        return Result(time.perf_counter() - started, e.code, error=e.read()[:200].decode(errors="replace"))
+    except Exception as e:
+        return Result(time.perf_counter() - started, "error", error=str(e))
+
+
+def worker(index, args, url, results, counter, lock):
+    rng = random.Random(args.seed + index)
+    questions = list(SCENARIOS)
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    while True:
+        with lock:
+            if counter[0] >= args.requests:
+                return
+            counter[0] += 1
+            sequence = counter[0]
+        question = rng.choice(questions)
+        if args.unique:
+            # Yanıt önbelleğini devre dışı bırakmadan her soruyu farklı kıl (model aynı senaryoyu oynatır)
+            question = f"{question} (#{sequence})"
+        result = send(opener, url, question, args.stream, not args.no_cache, args.timeout)
+        with lock:
+            results.append(result)
+
+
+def read_peak_rss_kb(pid):
+    """Linux'ta /proc/<pid>/status içindeki VmHWM (tepe RSS) değeri."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def spawn_server(args):
+    command = [sys.executable, os.path.join(BENCH_DIR, "bench_server.py"), "--port", str(args.port),
+               "--db-host", args.db_host, "--db-port", str(args.db_port), "--db-name", args.db_name,
+               "--db-user", args.db_user, "--db-password", args.db_password, "--db-sslmode", args.db_sslmode]
+    command += shlex.split(args.server_args)
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    # Sunucu dinlemeye başladığında bir satır yazar
+    line = server.stdout.readline()
+    if "listening" not in line:
+        server.kill()
+        raise SystemExit(f"benchmark server did not start: {line.strip()}")
+    threading.Thread(target=server.stdout.read, daemon=True).start()
+    return server
+
+
+def stop_server(server):
+    """Sunucuyu durdurur ve tepe RSS değerini (KB) döndürür."""
+    peak = read_peak_rss_kb(server.pid)
+    server.terminate()
+    server.wait(timeout=10)
+    if peak is None:
+        # /proc yoksa sonlanan alt süreçlerin en yüksek RSS değeri (macOS'ta bayt)
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        if sys.platform == "darwin":
+            peak //= 1024
+    return peak
+
+
+def summarize(results, elapsed, peak_rss_kb):
+    ok = [result for result in results if result.status == 200]
+    latencies = sorted(result.latency * 1000 for result in ok)
+    first_events = sorted(result.first_event * 1000 for result in ok if result.first_event is not None)
+    report = {
+        "requests": len(results),
+        "ok": len(ok),
+        "cached": sum(1 for result in ok if result.cached),
+        "rejected_429": sum(1 for result in results if result.status == 429),
+        "errors": sum(1 for result in results if result.status not in (200, 429)),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else None,
+        "peak_rss_mb": round(peak_rss_kb / 1024, 1) if peak_rss_kb else None,
+    }
+    for name, values in (("latency_ms", latencies), ("first_event_ms", first_events)):
+        if values:
+            report[name] = {
+                "p50": round(percentile(values, 0.50), 1),
+                "p95": round(percentile(values, 0.95), 1),
+                "p99": round(percentile(values, 0.99), 1),
+                "max": round(values[-1], 1),
+            }
+    errors = [result.error for result in results if result.error]
+    if errors:
+        report["first_error"] = errors[0]
+    return report
+
+
+def print_report(report, baseline=None):
+    def delta(path):
+        if baseline is None:
+            return ""
+        current, previous = report, baseline
+        for key in path:
+            current = (current or {}).get(key)
+            previous = (previous or {}).get(key)
+        if not current or not previous:
+            return ""
+        return f"  ({(current - previous) / previous * 100:+.1f}%)"
+
+    print(f"requests   {report['requests']}  ok {report['ok']}  cached {report['cached']}  "
+          f"429 {report['rejected_429']}  errors {report['errors']}")
+    print(f"throughput {report['throughput_rps']} req/s{delta(['throughput_rps'])}  in {report['elapsed_s']} s")
+    for name in ("latency_ms", "first_event_ms"):
+        if name in report:
+            print(name)
+            for key in ("p50", "p95", "p99", "max"):
+                print(f"  {key:<4} {report[name][key]:>10} ms{delta([name, key])}")
+    if report["peak_rss_mb"] is not None:
+        print(f"peak RSS   {report['peak_rss_mb']} MB{delta(['peak_rss_mb'])}")
+    if "first_error" in report:
+        print(f"first error: {report['first_error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_db_arguments(parser)
+    parser.add_argument("--url", default=None, help="server base URL (default http://127.0.0.1:<port>)")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--spawn-server", action="store_true", help="start bench_server.py as a child process")
+    parser.add_argument("--server-args", default="", help="extra arguments for bench_server.py")
+    parser.add_argument("--server-pid", type=int, default=None, help="read peak RSS of an already running server")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=0, help="requests sent before measuring")
+    parser.add_argument("--stream", action="store_true", help="use /api/chat/stream instead of /api/chat")
+    parser.add_argument("--no-cache", action="store_true", help="send use_cache=false (answer cache bypass)")
+    parser.add_argument("--unique", action="store_true", help="make every question unique")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="earlier --json report to compare against")
+    args = parser.parse_args()
+
+    server = spawn_server(args) if args.spawn_server else None
+    base_url = args.url or f"http://127.0.0.1:{args.port}"
+    url = base_url.rstrip("/") + ("/api/chat/stream" if args.stream else "/api/chat")
+    try:
+        if args.warmup:
+            opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+            for question in list(SCENARIOS)[:args.warmup]:
+                send(opener, url, question, args.stream, False, args.timeout)
+
+        results = []
+        counter = [0]
+        lock = threading.Lock()
+        threads = [threading.Thread(target=worker, args=(index, args, url, results, counter, lock))
+                   for index in range(args.concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        peak_rss_kb = stop_server(server) if server is not None else None
+    if peak_rss_kb is None and args.server_pid:
+        peak_rss_kb = read_peak_rss_kb(args.server_pid)
+
+    report = summarize(results, elapsed, peak_rss_kb)
+    report["config"] = {
+        "endpoint": "stream" if args.stream else "chat",
+        "concurrency": args.concurrency,
+        "no_cache": args.no_cache,
+        "unique": args.unique,
+        "server_args": args.server_args,
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
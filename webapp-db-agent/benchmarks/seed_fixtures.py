@@ -0,0 +1,114 @@
+"""
+Seeds a local PostgreSQL database for the benchmarks.
+
+Runs db_schema_and_data/db_script.sql (schema + demo rows) and then scales the
+tables to the requested row counts with generate_series. setseed() makes the
+generated data identical between runs, so results are comparable.
+
+    python benchmarks/seed_fixtures.py --db-name agent_bench --customers 10000 --orders 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+from bench_common import add_db_arguments
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "db_schema_and_data", "db_script.sql")
+
+# db_script.sql'deki demo satır sayıları; ölçekleme bunların üzerine eklenir
+BASE_PRODUCTS = 25
+BASE_CUSTOMERS = 10
+BASE_ORDERS = 12
+STATUSES = ["Beklemede", "Onaylandı", "Kargoda", "Teslim Edildi", "İptal"]
+
+SCALE_STATEMENTS = [
+    ("products", """
+        INSERT INTO products (product_name, category_id, unit_price, stock_quantity, description)
+        SELECT p.product_name || ' #' || g, p.category_id,
+               round((p.unit_price * (0.5 + random()))::numeric, 2), (random() * 200)::int, p.description
+        FROM generate_series(1, %(extra_products)s) g
+        JOIN products p ON p.product_id = 1 + g %% {base_products}
+    """.format(base_products=BASE_PRODUCTS)),
+    ("customers", """
+        INSERT INTO customers (first_name, last_name, email, phone, address, registration_date)
+        SELECT c.first_name, c.last_name, 'bench' || g || '.' || c.email, c.phone, c.address,
+               DATE '2022-01-01' + (random() * 730)::int
+        FROM generate_series(1, %(extra_customers)s) g
+        JOIN customers c ON c.customer_id = 1 + g %% {base_customers}
+    """.format(base_customers=BASE_CUSTOMERS)),
+    ("orders", """
+        INSERT INTO orders (customer_id, order_date, total_amount, status)
+        SELECT 1 + (random() * (%(customers)s - 1))::int,
+               TIMESTAMP '2022-01-01' + random() * INTERVAL '730 days',
+               0,
+               (%(statuses)s::text[])[1 + (random() * 4)::int]
+        FROM generate_series(1, %(extra_orders)s) g
+    """),
+    ("order_items", """
+        INSERT INTO order_items (order_id, product_id, quantity, unit_price, discount)
+        SELECT x.order_id, p.product_id, x.quantity, p.unit_price, x.discount
+        FROM (SELECT o.order_id,
+                     1 + (random() * (%(products)s - 1))::int AS product_id,
+                     1 + (random() * 4)::int AS quantity,
+                     CASE WHEN random() < 0.2 THEN 5.00 ELSE 0.00 END AS discount
+              FROM orders o
+              CROSS JOIN generate_series(1, %(items_per_order)s) i
+              WHERE o.order_id > {base_orders}) x
+        JOIN products p ON p.product_id = x.product_id
+    """.format(base_orders=BASE_ORDERS)),
+    ("order totals", """
+        UPDATE orders o SET total_amount = s.total
+        FROM (SELECT order_id, round(sum(quantity * unit_price * (1 - discount / 100)), 2) AS total
+              FROM order_items WHERE order_id > {base_orders} GROUP BY order_id) s
+        WHERE s.order_id = o.order_id
+    """.format(base_orders=BASE_ORDERS)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_db_arguments(parser)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--items-per-order", type=int, default=3)
+    parser.add_argument("--seed", type=float, default=0.42, help="setseed() value between -1 and 1")
+    args = parser.parse_args()
+
+    import psycopg2
+
+    params = {
+        "products": max(args.products, BASE_PRODUCTS),
+        "customers": max(args.customers, BASE_CUSTOMERS),
+        "extra_products": max(args.products - BASE_PRODUCTS, 0),
+        "extra_customers": max(args.customers - BASE_CUSTOMERS, 0),
+        "extra_orders": max(args.orders - BASE_ORDERS, 0),
+        "items_per_order": args.items_per_order,
+        "statuses": STATUSES,
+    }
+
+    connection = psycopg2.connect(host=args.db_host, port=args.db_port, dbname=args.db_name,
+                                  user=args.db_user, password=args.db_password, sslmode=args.db_sslmode)
+    try:
+        with connection, connection.cursor() as cursor:
+            started = time.perf_counter()
+            with open(SCRIPT_PATH, encoding="utf-8") as f:
+                cursor.execute(f.read())
+            cursor.execute("SELECT setseed(%s)", (args.seed,))
+            for name, statement in SCALE_STATEMENTS:
+                step_started = time.perf_counter()
+                cursor.execute(statement, params)
+                print(f"  {name:<12} {cursor.rowcount:>10} rows  {time.perf_counter() - step_started:7.2f} s")
+        # ANALYZE transaction dışında çalışır; EXPLAIN maliyet tahminleri gerçek boyutlara göre olsun
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        print(f"seeded {args.db_name} in {time.perf_counter() - started:.2f} s")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
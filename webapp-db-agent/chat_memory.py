@@ -0,0 +1,126 @@
+import os
+import re
+from typing import Any, Dict, List
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.messages import SystemMessage, get_buffer_string
+
+from observation_format import estimate_tokens, CHARS_PER_TOKEN
+
+# Prompt'a giden sohbet geçmişi için token bütçeleri (yaklaşık: 4 karakter ~ 1 token)
+CHAT_MEMORY_TOKEN_BUDGET = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", 2000))
+CHAT_MEMORY_MESSAGE_TOKENS = int(os.getenv("CHAT_MEMORY_MESSAGE_TOKENS", 400))
+CHAT_MEMORY_SUMMARY_TOKENS = int(os.getenv("CHAT_MEMORY_SUMMARY_TOKENS", 300))
+SUMMARY_LINE_CHARS = 160
+TABLE_ROWS_KEPT = 5
+
+_HTML_TABLE_PATTERN = re.compile(r"<table\b.*?</table>", re.IGNORECASE | re.DOTALL)
+_HTML_BREAK_PATTERN = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_HTML_TAG_PATTERN = re.compile(r"</?[a-zA-Z][^>]*>")
+_BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def _shorten(text, limit):
+    text = _WHITESPACE_PATTERN.sub(" ", text).strip()
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def compact_message(text, max_tokens=CHAT_MEMORY_MESSAGE_TOKENS):
+    """Geçmişe yazılmadan önce hacimli içeriği atar: HTML tablolar, uzun Markdown tabloları, fazla uzun metin."""
+    text = _HTML_TABLE_PATTERN.sub("[result table omitted]", text)
+    text = _HTML_BREAK_PATTERN.sub("\n", text)
+    text = _HTML_TAG_PATTERN.sub("", text)
+
+    lines = []
+    table_rows = 0
+    for line in text.split("\n"):
+        if line.lstrip().startswith("|"):
+            table_rows += 1
+            if table_rows > TABLE_ROWS_KEPT:
+                continue
+        elif table_rows > TABLE_ROWS_KEPT:
+            lines.append(f"[{table_rows - TABLE_ROWS_KEPT} more table rows omitted]")
+            table_rows = 0
+        else:
+            table_rows = 0
+        lines.append(line)
+    if table_rows > TABLE_ROWS_KEPT:
+        lines.append(f"[{table_rows - TABLE_ROWS_KEPT} more table rows omitted]")
+    text = _BLANK_LINES_PATTERN.sub("\n\n", "\n".join(lines)).strip()
+
+    if estimate_tokens(text) > max_tokens:
+        text = text[:max_tokens * CHARS_PER_TOKEN].rstrip() + " … [truncated]"
+    return text
+
+
+def summarize_turn(question, answer):
+    """Bütçeden taşan bir soru-cevap turunun tek satırlık özeti (LLM çağrısı gerektirmez)."""
+    first_line = next((line for line in answer.split("\n") if line.strip()), "")
+    return f"- User asked: {_shorten(question, SUMMARY_LINE_CHARS)} | Answer: {_shorten(first_line, SUMMARY_LINE_CHARS)}"
+
+
+class TokenBudgetMemory(BaseChatMemory):
+    """
+    Conversation memory with a real token budget.
+    - messages are compacted when saved: HTML result tables, long Markdown tables
+      and oversized text are removed or cut first
+    - when the history exceeds max_token_limit, the oldest turns are folded into a
+      rolling one-line-per-turn summary, which is itself capped at max_summary_tokens
+    - tokens are estimated locally from the text length, no tokenizer or LLM call
+    """
+    human_prefix: str = "Human"
+    ai_prefix: str = "AI"
+    memory_key: str = "chat_history"
+    max_token_limit: int = CHAT_MEMORY_TOKEN_BUDGET
+    max_message_tokens: int = CHAT_MEMORY_MESSAGE_TOKENS
+    max_summary_tokens: int = CHAT_MEMORY_SUMMARY_TOKENS
+    summary: List[str] = []
+    omitted_turns: int = 0
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def _summary_text(self):
+        lines = ["Summary of the earlier conversation:"]
+        if self.omitted_turns:
+            lines.append(f"- ({self.omitted_turns} older turns omitted)")
+        return "\n".join(lines + self.summary)
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        messages = list(self.chat_memory.messages)
+        if self.summary or self.omitted_turns:
+            messages.insert(0, SystemMessage(content=self._summary_text()))
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        input_str, output_str = self._get_input_output(inputs, outputs)
+        self.chat_memory.add_user_message(compact_message(input_str, self.max_message_tokens))
+        self.chat_memory.add_ai_message(compact_message(output_str, self.max_message_tokens))
+        self._prune()
+
+    def _prune(self):
+        # ConversationSummaryBufferMemory gibi mesaj listesi yerinde kısaltılır
+        messages = self.chat_memory.messages
+        summary_tokens = sum(estimate_tokens(line) + 1 for line in self.summary)
+        message_tokens = sum(estimate_tokens(str(message.content)) for message in messages)
+        # En yeni tur her zaman tam kalır; daha eski turlar özete taşınır
+        while len(messages) > 2 and message_tokens + summary_tokens > self.max_token_limit:
+            question, answer = messages[0], messages[1]
+            del messages[:2]
+            message_tokens -= estimate_tokens(str(question.content)) + estimate_tokens(str(answer.content))
+            line = summarize_turn(str(question.content), str(answer.content))
+            self.summary.append(line)
+            summary_tokens += estimate_tokens(line) + 1
+            # Özet de sınırlıdır; en eski özet satırları düşer
+            while self.summary and summary_tokens > self.max_summary_tokens:
+                summary_tokens -= estimate_tokens(self.summary.pop(0)) + 1
+                self.omitted_turns += 1
+
+    def clear(self) -> None:
+        super().clear()
+        self.summary = []
+        self.omitted_turns = 0
@@ -0,0 +1,160 @@
+import copy
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from threading import RLock
+
+try:
+    import fcntl  # birden çok worker süreci aynı dosyayı güncelleyebilir (Windows'ta yok)
+except ImportError:
+    fcntl = None
+
+# Dosyanın dışarıdan değişip değişmediği (mtime/boyut) en fazla bu sıklıkla kontrol edilir
+CONFIG_RELOAD_INTERVAL = float(os.getenv("CONFIG_RELOAD_INTERVAL", 1.0))  # saniye
+
+
+class JsonConfigStore:
+    """
+    JSON file backed dictionary kept in memory (saved LLM models, DB connections).
+    - the file is parsed once; reads are served from memory and the file is only
+      parsed again when its mtime or size changed (external edits)
+    - updates are read-modify-write under a lock (and a file lock across worker
+      processes) and are persisted atomically: temp file + fsync + os.replace
+    - an unreadable file never replaces the last good copy in memory
+    """
+    def __init__(self, path, reload_interval=CONFIG_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._data = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = RLock()
+        self._loads = 0
+        self._writes = 0
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self, force=False):
+        now = time.monotonic()
+        if self._data is not None and not force and now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        signature = self._stat_signature()
+        if self._data is not None and signature == self._signature:
+            return
+        data = {}
+        if signature is not None:
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                # Yarım/bozuk dosya: son geçerli kopya kullanılmaya devam eder
+                print(f"Error loading {self.path}: {str(e)}")
+                self._signature = signature
+                if self._data is not None:
+                    return
+                data = {}
+            if not isinstance(data, dict):
+                data = {}
+        self._data = data
+        self._signature = signature
+        self._loads += 1
+
+    def _write(self, data):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp 0600 ile oluşturur; mevcut dosyanın izinleri korunur
+            try:
+                mode = os.stat(self.path).st_mode & 0o777
+            except FileNotFoundError:
+                mode = 0o644
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._data = data
+        self._signature = self._stat_signature()
+        self._checked_at = time.monotonic()
+        self._writes += 1
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + ".lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def all(self):
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._data)
+
+    def names(self):
+        with self._lock:
+            self._refresh()
+            return list(self._data)
+
+    def get(self, name, default=None):
+        with self._lock:
+            self._refresh()
+            if name not in self._data:
+                return default
+            return copy.deepcopy(self._data[name])
+
+    def __contains__(self, name):
+        with self._lock:
+            self._refresh()
+            return name in self._data
+
+    def update(self, mutate):
+        """mutate(data) kopya üzerinde çalışır; başarılı olursa dosyaya atomik olarak yazılır."""
+        with self._lock, self._file_lock():
+            # Başka bir sürecin yazdıklarını kaybetmemek için önce diskteki son hali oku
+            self._refresh(force=True)
+            data = copy.deepcopy(self._data)
+            mutate(data)
+            self._write(data)
+
+    def set(self, name, value):
+        self.update(lambda data: data.__setitem__(name, value))
+
+    def ensure_file(self):
+        """Dosya yoksa ya da geçerli JSON değilse boş bir sözlükle oluşturur."""
+        with self._lock, self._file_lock():
+            try:
+                with open(self.path, 'r') as f:
+                    json.load(f)
+                return False
+            except FileNotFoundError:
+                pass
+            except ValueError:
+                print(f"Invalid JSON file found. Recreating {self.path}")
+            self._write({})
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data or {}),
+                "loads": self._loads,
+                "writes": self._writes,
+            }
@@ -0,0 +1,282 @@
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Condition, RLock
+
+# Havuz ayarları - ortam değişkenleriyle değiştirilebilir
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", 300))  # saniye
+DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", 30))  # saniye
+# Bu süreden uzun bekleyen bağlantılar teslim edilmeden önce SELECT 1 ile test edilir
+DB_POOL_HEALTH_CHECK_AFTER = float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", 30))
+
+
+class PoolExhaustedError(Exception):
+    pass
+
+
+def config_key(config):
+    """Bir DB_CONFIG sözlüğünü havuz anahtarına çevirir."""
+    return (
+        config.get("host"),
+        int(config.get("port") or 5432),
+        config.get("name"),
+        config.get("user"),
+        config.get("password"),
+        config.get("sslmode"),
+    )
+
+
+def connect(config):
+    # psycopg2 ilk bağlantıda import edilir (uygulama açılışını yavaşlatmasın)
+    import psycopg2
+    return psycopg2.connect(
+        host=config["host"],
+        port=config["port"],
+        database=config["name"],
+        user=config["user"],
+        password=config["password"],
+        sslmode=config["sslmode"]
+    )
+
+
+class PostgresConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool for a single DB_CONFIG.
+    - min_size connections are opened up front and kept warm
+    - at most max_size connections exist at the same time (idle + in use)
+    - idle connections older than idle_timeout are closed (never below min_size)
+    - connections are health-checked on checkout and replaced if broken
+    - temporary pools (other databases queried by fan-out) keep no warm connections
+      and are closed by PoolManager after idle_timeout without use
+    """
+    def __init__(self, config, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                 idle_timeout=DB_POOL_IDLE_TIMEOUT, health_check_after=DB_POOL_HEALTH_CHECK_AFTER,
+                 temporary=False):
+        self.config = dict(config)
+        self.key = config_key(config)
+        self.temporary = temporary
+        if temporary:
+            min_size = 0
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self._idle = deque()  # (connection, son kullanım zamanı)
+        self._size = 0        # açık bağlantı sayısı (idle + kullanımda)
+        self._closed = False
+        self._last_used = time.monotonic()
+        self._cond = Condition(RLock())
+
+    def prewarm(self):
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            connection = self._open_reserved()
+            with self._cond:
+                self._idle.append((connection, time.monotonic()))
+                self._cond.notify()
+
+    def _open_reserved(self):
+        # Yer (self._size) kilit altında ayrıldı; el sıkışma kilit dışında yapılır
+        try:
+            return connect(self.config)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _discard(self, connection):
+        self._size -= 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+        self._cond.notify()
+
+    def _is_healthy(self, connection, idle_since):
+        from psycopg2 import extensions
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - idle_since < self.health_check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        kept = deque()
+        while self._idle:
+            connection, idle_since = self._idle.popleft()
+            expired = now - idle_since > self.idle_timeout
+            if (expired or connection.closed) and self._size > self.min_size:
+                self._discard(connection)
+            else:
+                kept.append((connection, idle_since))
+        self._idle = kept
+
+    def getconn(self, timeout=DB_POOL_CHECKOUT_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolExhaustedError("Connection pool is closed")
+                self._evict_idle()
+                if self._idle:
+                    # En son kullanılan bağlantıyı al (LIFO) - eskiler idle_timeout ile düşer
+                    connection, idle_since = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                    connection = None
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolExhaustedError(
+                            f"No free database connection within {timeout} seconds (max_size={self.max_size})")
+                    self._cond.wait(remaining)
+                    continue
+            if connection is None:
+                return self._open_reserved()
+            if self._is_healthy(connection, idle_since):
+                return connection
+            with self._cond:
+                self._discard(connection)
+
+    def putconn(self, connection, discard=False):
+        if not discard and not connection.closed:
+            try:
+                # Agent commit etmediği için açık kalan transaction'ı geri al (eski close() davranışı)
+                connection.rollback()
+            except Exception:
+                discard = True
+        with self._cond:
+            self._last_used = time.monotonic()
+            if self._closed or discard or connection.closed:
+                self._discard(connection)
+                return
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        import psycopg2
+        connection = self.getconn()
+        broken = False
+        try:
+            yield connection
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            # İptal edilen sorgu (statement_timeout / cancel) bağlantıyı bozmaz; rollback ile havuza döner
+            broken = not isinstance(e, psycopg2.extensions.QueryCanceledError)
+            raise
+        finally:
+            self.putconn(connection, discard=broken)
+
+    def unused_for(self):
+        """Kullanımda bağlantı yoksa son iadeden bu yana geçen süre (saniye), varsa 0."""
+        with self._cond:
+            if self._size > len(self._idle):
+                return 0.0
+            return time.monotonic() - self._last_used
+
+    def close(self):
+        """Havuzu boşaltır. Kullanımdaki bağlantılar iade edildiklerinde kapatılır."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                connection, _ = self._idle.popleft()
+                self._discard(connection)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
+
+
+class PoolManager:
+    """
+    Keeps one PostgresConnectionPool per DB_CONFIG.
+    Switching databases drains the old pool and builds a fresh one.
+    Temporary pools unused for their idle_timeout are closed on the next get_pool().
+    """
+    def __init__(self):
+        self._pools = {}
+        self._lock = RLock()
+
+    def get_pool(self, config, temporary=False):
+        """temporary yalnızca havuz yeni oluşturuluyorsa etkilidir; aktif veritabanının havuzu kalıcı kalır."""
+        key = config_key(config)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = PostgresConnectionPool(config, temporary=temporary)
+                self._pools[key] = pool
+            expired = [other_key for other_key, other in self._pools.items()
+                       if other_key != key and other.temporary and other.unused_for() > other.idle_timeout]
+            expired_pools = [self._pools.pop(other_key) for other_key in expired]
+        for expired_pool in expired_pools:
+            expired_pool.close()
+        return pool
+
+    @contextmanager
+    def connection(self, config, temporary=False):
+        with self.get_pool(config, temporary).connection() as connection:
+            yield connection
+
+    def rebuild(self, config):
+        """Verilen yapılandırmanın havuzunu boşaltıp yeniden oluşturur ve ısıtır."""
+        key = config_key(config)
+        with self._lock:
+            old_pool = self._pools.pop(key, None)
+            pool = PostgresConnectionPool(config)
+            self._pools[key] = pool
+        if old_pool is not None:
+            old_pool.close()
+        pool.prewarm()
+        return pool
+
+    def switch(self, old_config, new_config):
+        """Aktif veritabanı değiştiğinde: yeni havuzu kur ve test et, eskisini boşalt."""
+        pool = self.rebuild(new_config)
+        with pool.connection():
+            pass  # min_size=0 olsa bile en az bir bağlantı açılarak test edilir
+        if old_config and config_key(old_config) != pool.key:
+            self.drain(old_config)
+        return pool
+
+    def drain(self, config=None):
+        """Tek bir yapılandırmanın ya da (config verilmezse) tüm havuzları kapatır."""
+        with self._lock:
+            if config is None:
+                pools = list(self._pools.values())
+                self._pools.clear()
+            else:
+                pool = self._pools.pop(config_key(config), None)
+                pools = [pool] if pool else []
+        for pool in pools:
+            pool.close()
+
+    def stats(self):
+        with self._lock:
+            return {f"{key[3]}@{key[0]}:{key[1]}/{key[2]}": pool.stats() for key, pool in self._pools.items()}
+
+
+db_pool = PoolManager()
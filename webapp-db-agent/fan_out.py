@@ -0,0 +1,100 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from threading import Lock
+
+FANOUT_WORKERS = int(os.getenv("FANOUT_WORKERS", 8))
+FANOUT_TIMEOUT = float(os.getenv("FANOUT_TIMEOUT", 20))  # saniye, bağlantı başına
+FANOUT_POLL_INTERVAL = 0.25  # saniye; süreler ve üst çalışmanın iptali bu sıklıkla kontrol edilir
+FANOUT_CANCEL_GRACE = 5.0  # saniye; iptal edilen işin bitmesi için beklenen ek süre
+
+
+class FanOutTimeoutError(Exception):
+    pass
+
+
+class FanOutExecutor:
+    """
+    Runs the same job against several targets (saved database connections) at once.
+    - one shared, bounded thread pool for all requests
+    - every target gets its own deadline, counted from the moment its job starts
+    - a target that fails or times out does not affect the others; results keep target order
+    """
+    def __init__(self, max_workers=FANOUT_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fan-out")
+        self._lock = Lock()
+        self._runs = 0
+        self._targets = 0
+        self._timeouts = 0
+        self._errors = 0
+
+    def run(self, targets, job, timeout=FANOUT_TIMEOUT, on_timeout=None, is_cancelled=None):
+        """
+        targets: [(name, value)], job(name, value) -> sonuç
+        on_timeout(name): süresi dolan işi durdurmak için (ör. sunucudaki sorguyu iptal et)
+        Dönüş: [(name, sonuç, hata)] - targets sırasıyla
+        """
+        started_at = {}
+
+        def timed(name, value):
+            started_at[name] = time.monotonic()
+            return job(name, value)
+
+        futures = {self._pool.submit(timed, name, value): name for name, value in targets}
+        pending = set(futures)
+        expired = {}  # name -> süre dolduğunda iptal istendiği an
+        while pending:
+            _, pending = wait(pending, timeout=FANOUT_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            cancelled = is_cancelled is not None and is_cancelled()
+            for future in list(pending):
+                name = futures[future]
+                if name not in started_at:
+                    # Henüz başlamamış iş; üst çalışma iptal edildiyse hiç çalıştırma
+                    if cancelled and future.cancel():
+                        pending.discard(future)
+                    continue
+                if name in expired:
+                    # İptale rağmen bitmeyen iş beklenmez; thread arka planda sonlanır
+                    if now - expired[name] > FANOUT_CANCEL_GRACE:
+                        pending.discard(future)
+                    continue
+                if cancelled or now - started_at[name] > timeout:
+                    expired[name] = now
+                    if on_timeout is not None:
+                        on_timeout(name)
+
+        results = []
+        timeouts = errors = 0
+        for future, name in futures.items():
+            if future.cancelled():
+                results.append((name, None, FanOutTimeoutError("cancelled before it started")))
+                errors += 1
+            elif name in expired:
+                results.append((name, None, FanOutTimeoutError(f"timed out after {timeout:g} s")))
+                timeouts += 1
+            elif future.exception() is not None:
+                results.append((name, None, future.exception()))
+                errors += 1
+            else:
+                results.append((name, future.result(), None))
+        with self._lock:
+            self._runs += 1
+            self._targets += len(targets)
+            self._timeouts += timeouts
+            self._errors += errors
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "runs": self._runs,
+                "targets": self._targets,
+                "timeouts": self._timeouts,
+                "errors": self._errors,
+            }
+
+
+fan_out_executor = FanOutExecutor()
@@ -0,0 +1,158 @@
+import os
+from contextlib import contextmanager
+from threading import RLock
+
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 20))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", 120))  # saniye
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", 120))  # saniye
+LLM_WARM_UP_PROMPT = "Hello, are you working?"
+
+
+def llm_config_key(config):
+    return (
+        config.get("endpoint"),
+        config.get("deployment_name"),
+        config.get("api_version"),
+        config.get("api_key"),
+        float(config.get("temperature") or 0.0),
+    )
+
+
+class _LLMEntry:
+    __slots__ = ("http_client", "clients", "warmed")
+
+    def __init__(self, http_client):
+        self.http_client = http_client
+        self.clients = {}  # streaming (bool) -> AzureChatOpenAI
+        self.warmed = False
+
+
+class LLMClientRegistry:
+    """
+    Shared Azure OpenAI clients, one entry per model configuration.
+    - every entry owns a single keep-alive httpx client; the streaming and
+      non-streaming chat clients of that configuration share its connection pool
+    - warm_up() sends one test prompt per configuration (TLS handshake + validation)
+    - evict() retires a deleted or replaced configuration; its connection pool is
+      closed once every agent run started before the eviction (run()) has finished
+    """
+    def __init__(self, factory):
+        self._factory = factory  # (config, streaming, http_client) -> chat model
+        self._entries = {}
+        self._lock = RLock()
+        self._generation = 0
+        self._runs = {}  # generation -> devam eden çalıştırma sayısı
+        self._retired = []  # (generation, entry): kapatılmayı bekleyen istemciler
+
+    def _new_http_client(self):
+        import httpx
+        return httpx.Client(
+            timeout=LLM_HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    def get(self, config, streaming=False):
+        key = llm_config_key(config)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _LLMEntry(self._new_http_client())
+                self._entries[key] = entry
+            client = entry.clients.get(streaming)
+            if client is None:
+                client = self._factory(config, streaming, entry.http_client)
+                entry.clients[streaming] = client
+            return client
+
+    def warm_up(self, config):
+        """
+        Yapılandırma başına bir kez test mesajı gönderir. Hata olursa istemci yalnızca
+        bu çağrı oluşturduysa bırakılır; kullanımdaki (ör. aktif modelin) istemcisi kapatılmaz.
+        """
+        key = llm_config_key(config)
+        with self._lock:
+            created = key not in self._entries
+            client = self.get(config)
+            if self._entries[key].warmed:
+                return
+        try:
+            client.invoke(LLM_WARM_UP_PROMPT)
+        except Exception:
+            if created:
+                with self._lock:
+                    entry = self._entries.get(key)
+                    # Bu arada agent'lara streaming istemci verildiyse giriş korunur
+                    if entry is not None and not entry.warmed and True not in entry.clients:
+                        del self._entries[key]
+                    else:
+                        entry = None
+                if entry is not None:
+                    entry.http_client.close()
+            raise
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.warmed = True
+
+    def serves_agents(self, config):
+        """Yapılandırmanın (streaming) istemcisi agent'lara verildi mi."""
+        with self._lock:
+            entry = self._entries.get(llm_config_key(config))
+            return entry is not None and True in entry.clients
+
+    @contextmanager
+    def run(self):
+        """
+        Bir agent çalıştırmasını kaydeder. Çıkarılan istemciler, çıkarılmadan önce
+        başlamış çalıştırmaların hepsi bitene kadar açık kalır.
+        """
+        with self._lock:
+            generation = self._generation
+            self._runs[generation] = self._runs.get(generation, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._runs[generation] -= 1
+                if not self._runs[generation]:
+                    del self._runs[generation]
+                closing = self._drain_retired()
+            for entry in closing:
+                entry.http_client.close()
+
+    def _drain_retired(self):
+        # En eski devam eden çalıştırmadan önce çıkarılmış istemciler artık kullanılmıyor
+        oldest = min(self._runs, default=self._generation)
+        closing = [entry for generation, entry in self._retired if generation < oldest]
+        self._retired = [(generation, entry) for generation, entry in self._retired if generation >= oldest]
+        return closing
+
+    def evict(self, config):
+        """
+        Yapılandırmayı kayıt defterinden çıkarır; yeni istekler onu artık almaz.
+        Bağlantı havuzu, o ana kadar başlamış çalıştırmalar bitince kapatılır.
+        Agent'lar bu istemciyi kullanıyorsa çağıran onları önceden bırakmalıdır.
+        """
+        with self._lock:
+            entry = self._entries.pop(llm_config_key(config), None)
+            if entry is None:
+                return
+            self._retired.append((self._generation, entry))
+            self._generation += 1
+            closing = self._drain_retired()
+        for entry in closing:
+            entry.http_client.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "configs": len(self._entries),
+                "clients": sum(len(entry.clients) for entry in self._entries.values()),
+                "warmed": sum(1 for entry in self._entries.values() if entry.warmed),
+                "retired": len(self._retired),
+                "runs": sum(self._runs.values()),
+            }
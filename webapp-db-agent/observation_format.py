@@ -0,0 +1,96 @@
+import math
+import numbers
+import os
+
+# LLM'e giden tool çıktıları için token bütçeleri (yaklaşık: 4 karakter ~ 1 token)
+OBSERVATION_TOKEN_BUDGET = int(os.getenv("OBSERVATION_TOKEN_BUDGET", 1500))
+SCHEMA_TOKEN_BUDGET = int(os.getenv("SCHEMA_TOKEN_BUDGET", 4000))
+MAX_CELL_CHARS = int(os.getenv("OBSERVATION_MAX_CELL_CHARS", 80))
+CHARS_PER_TOKEN = 4
+
+# information_schema tip adlarının kısa karşılıkları
+_SHORT_TYPES = {
+    "character varying": "varchar",
+    "character": "char",
+    "timestamp without time zone": "timestamp",
+    "timestamp with time zone": "timestamptz",
+    "time without time zone": "time",
+    "time with time zone": "timetz",
+    "double precision": "float8",
+    "boolean": "bool",
+    "integer": "int",
+}
+
+
+def estimate_tokens(text):
+    """Tokenizer gerektirmeyen kaba token tahmini."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def short_type(data_type):
+    return _SHORT_TYPES.get(data_type, data_type)
+
+
+def _is_null(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _cell(value):
+    if _is_null(value):
+        return "NULL"
+    text = str(value).replace("\t", " ").replace("\n", " ")
+    if len(text) > MAX_CELL_CHARS:
+        text = text[:MAX_CELL_CHARS - 1] + "…"
+    return text
+
+
+def summarize_columns(df, max_values=3):
+    """Gösterilemeyen satırlar için sütun bazlı kısa özet."""
+    lines = []
+    for column in df.columns:
+        series = df[column].dropna()
+        if series.empty:
+            lines.append(f"{column}: all NULL")
+            continue
+        if all(isinstance(value, numbers.Number) and not isinstance(value, bool) for value in series):
+            lines.append(f"{column}: min={series.min()} max={series.max()} avg={round(float(series.mean()), 2)}")
+        else:
+            counts = series.astype(str).value_counts()
+            top = ", ".join(f"{_cell(value)} ({count})" for value, count in counts.head(max_values).items())
+            lines.append(f"{column}: {len(counts)} distinct, top: {top}")
+    return lines
+
+
+def format_table_compact(df, total_rows=None, truncated=False, token_budget=OBSERVATION_TOKEN_BUDGET):
+    """
+    Query result as tab-separated text: a row count line, a header line and one line per row.
+    Rows that do not fit into token_budget are left out and summarized per column.
+    """
+    if len(df.columns) == 0:
+        return "Statement executed, no rows returned."
+
+    total = total_rows if total_rows is not None else len(df)
+    header = "\t".join(str(column) for column in df.columns)
+    lines = [header]
+    used = estimate_tokens(header) + 10
+    shown = 0
+    for row in df.itertuples(index=False, name=None):
+        line = "\t".join(_cell(value) for value in row)
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget:
+            break
+        lines.append(line)
+        used += cost
+        shown += 1
+
+    if shown == total and not truncated:
+        return "\n".join([f"rows: {total}"] + lines)
+
+    # Toplam satır sayısı bilinmiyorsa (sayım zaman aşımı) en az çekilen kadar satır vardır
+    total_label = total if total_rows is not None or not truncated else f"more than {len(df)}"
+    result = [f"rows: {total_label} (showing first {shown}{', result truncated' if truncated else ''})"] + lines
+    if shown < len(df):
+        # Özet yalnızca bütçe dışı kalan çekilmiş satırlar için anlamlı
+        result.append(f"summary of the {len(df)} fetched rows:")
+        result.extend(summarize_columns(df))
+    return "\n".join(result)
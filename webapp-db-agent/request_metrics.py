@@ -0,0 +1,220 @@
+import os
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+# İstek bazlı süre dökümü: X-Request-Timing: 1 başlığıyla ya da bu ayarla her yanıtta Server-Timing döner
+METRICS_TIMING_HEADER = os.getenv("METRICS_TIMING_HEADER", "false").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 50)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 200, 500, 1000, 10000, 100000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+STAGES = ("queue", "llm", "tool", "sql", "format")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram rendered in the Prometheus text format."""
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.labelnames = tuple(labelnames)
+        self._series = {}  # label değerleri -> [bucket sayaçları, toplam, adet]
+        self._lock = Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(pairs + [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(pairs)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(pairs)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend(f"{self.name}{_labels(list(zip(self.labelnames, key)))} {_number(value)}" for key, value in values)
+        return lines
+
+
+class RequestTrace:
+    """
+    Latency breakdown of one chat request.
+    - LLM calls and token counts, tool calls and SQL statements are recorded as they happen
+    - stage totals (queue, llm, tool, sql, format) are reported through timings()/server_timing()
+    - finish() adds the request to the aggregated histograms exactly once
+    """
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.cached = False
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tools = []   # (tool, ms, hata)
+        self.sql = []     # (ms, satır, bayt)
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.response_bytes = 0
+        self._finished = None
+        self._lock = Lock()
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, (time.perf_counter() - started) * 1000)
+
+    def add_stage(self, name, elapsed_ms):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+
+    def add_llm_call(self, elapsed_ms, prompt_tokens, completion_tokens):
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.stages["llm"] += elapsed_ms
+
+    def add_tool_call(self, tool, elapsed_ms, error=False):
+        with self._lock:
+            self.tools.append((tool, elapsed_ms, error))
+            self.stages["tool"] += elapsed_ms
+        metrics.tool_duration.observe(elapsed_ms / 1000, tool=tool, error=str(error).lower())
+
+    def add_sql(self, elapsed_ms, rows, size):
+        with self._lock:
+            self.sql.append((elapsed_ms, rows, size))
+            self.stages["sql"] += elapsed_ms
+        metrics.sql_duration.observe(elapsed_ms / 1000)
+        metrics.sql_rows.observe(rows)
+        metrics.sql_bytes.observe(size)
+
+    def elapsed_ms(self):
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return (end - self.started) * 1000
+
+    def timings(self):
+        with self._lock:
+            return {
+                "total_ms": round(self.elapsed_ms(), 1),
+                **{f"{name}_ms": round(value, 1) for name, value in self.stages.items()},
+                "llm_calls": self.llm_calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "tool_calls": len(self.tools),
+                "sql_statements": len(self.sql),
+                "sql_rows": sum(rows for _, rows, _ in self.sql),
+                "sql_bytes": sum(size for _, _, size in self.sql),
+                "cached": self.cached,
+            }
+
+    def server_timing(self):
+        # Tool süresi SQL süresini de içerir; tarayıcı geliştirici araçlarında ayrı ayrı görünür
+        with self._lock:
+            parts = [f"{name};dur={value:.1f}" for name, value in self.stages.items() if value]
+        parts.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(parts)
+
+    def finish(self, status="ok"):
+        with self._lock:
+            if self._finished is not None:
+                return
+            self._finished = time.perf_counter()
+        metrics.observe_request(self, status)
+
+
+class RequestMetrics:
+    """Process-wide aggregated chat metrics, exposed on /metrics."""
+    def __init__(self):
+        self.requests = Counter("chat_requests_total", "Chat requests by endpoint and outcome.", ("endpoint", "status"))
+        self.request_duration = Histogram("chat_request_duration_seconds", "End-to-end chat request latency.",
+                                          LATENCY_BUCKETS, ("endpoint", "cached"))
+        self.stage_duration = Histogram("chat_stage_duration_seconds", "Time spent per stage within one chat request.",
+                                        LATENCY_BUCKETS, ("stage",))
+        self.llm_calls = Histogram("chat_llm_calls", "LLM calls per chat request.", COUNT_BUCKETS)
+        self.llm_tokens = Histogram("chat_llm_tokens", "LLM tokens per chat request.", TOKEN_BUCKETS, ("kind",))
+        self.tool_duration = Histogram("chat_tool_duration_seconds", "Wall time per tool call.",
+                                       LATENCY_BUCKETS, ("tool", "error"))
+        self.sql_duration = Histogram("chat_sql_duration_seconds", "Wall time per SQL statement.", LATENCY_BUCKETS)
+        self.sql_rows = Histogram("chat_sql_rows", "Rows fetched per SQL statement.", ROW_BUCKETS)
+        self.sql_bytes = Histogram("chat_sql_bytes", "Approximate bytes fetched per SQL statement.", BYTE_BUCKETS)
+        self.response_bytes = Histogram("chat_response_bytes", "Size of the chat response sent to the client.",
+                                        BYTE_BUCKETS)
+
+    def observe_request(self, trace, status):
+        self.requests.inc(endpoint=trace.endpoint, status=status)
+        self.request_duration.observe(trace.elapsed_ms() / 1000, endpoint=trace.endpoint,
+                                      cached=str(trace.cached).lower())
+        if status != "ok" or trace.cached:
+            return
+        for name, value in trace.stages.items():
+            self.stage_duration.observe(value / 1000, stage=name)
+        self.llm_calls.observe(trace.llm_calls)
+        self.llm_tokens.observe(trace.prompt_tokens, kind="prompt")
+        self.llm_tokens.observe(trace.completion_tokens, kind="completion")
+        self.response_bytes.observe(trace.response_bytes)
+
+    def render(self):
+        lines = []
+        for metric in (self.requests, self.request_duration, self.stage_duration, self.llm_calls, self.llm_tokens,
+                       self.tool_duration, self.sql_duration, self.sql_rows, self.sql_bytes, self.response_bytes):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = RequestMetrics()
@@ -0,0 +1,71 @@
+import re
+
+# Tek bir önceden derlenmiş desen: "- x" / "* x" -> ul, "1. x" -> ol
+# re.match satır başından eşleştirdiği için ^ gerekmez
+_LIST_ITEM_PATTERN = re.compile(r'(?:([-*])|\d+\.)\s+(.*)')
+
+
+class ResponseRenderer:
+    """
+    Incremental Markdown-list to HTML renderer for chat answers.
+    - "-", "*" items become <ul>, "1." items become <ol>, other non-empty lines become <p>
+    - text can be fed in arbitrary chunks (streaming); only completed lines are rendered
+    - every line is looked at once, with a single precompiled pattern
+    """
+    def __init__(self):
+        self._pending = ""     # henüz satır sonu gelmemiş metin
+        self._list_type = None # 'ul', 'ol' veya None
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def feed(self, text):
+        if "\n" not in text:
+            self._pending += text
+            return ""
+        lines = (self._pending + text).split("\n")
+        self._pending = lines.pop()
+        out = []
+        render_line = self._render_line
+        for line in lines:
+            render_line(line, out)
+        return "".join(out)
+
+    def close(self):
+        out = []
+        if self._pending:
+            self._render_line(self._pending, out)
+            self._pending = ""
+        # Metin bittiğinde açık liste varsa kapat
+        if self._list_type:
+            out.append(f'</{self._list_type}>')
+            self._list_type = None
+        return "".join(out)
+
+    def _render_line(self, line, out):
+        line = line.strip()
+        match = _LIST_ITEM_PATTERN.match(line) if line else None
+
+        if match:
+            list_type = 'ul' if match.group(1) else 'ol'
+            if self._list_type != list_type:
+                if self._list_type: # Önceki listeyi kapat
+                    out.append(f'</{self._list_type}>')
+                out.append(f'<{list_type}>')
+                self._list_type = list_type
+            out.append(f'<li>{match.group(2).strip()}</li>')
+            return
+
+        # Liste bittiyse kapat
+        if self._list_type:
+            out.append(f'</{self._list_type}>')
+            self._list_type = None
+        # Normal satırları <p> içine al, boş satırları atla
+        if line:
+            out.append(f'<p>{line}</p>')
+
+
+def render_response(text):
+    renderer = ResponseRenderer()
+    return renderer.feed(text.strip()) + renderer.close()
@@ -0,0 +1,128 @@
+import os
+import re
+import time
+from collections import OrderedDict
+from threading import RLock
+
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", 120))  # saniye
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+# Tırnak içindeki metinler ('...', "...") normalize edilmeden korunur
+_SQL_QUOTED_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+_SQL_COMMENT_PATTERN = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_READ_ONLY_PATTERN = re.compile(r"^(select|with|values|table)\b")
+# Yan etkisi olan ya da her çalıştırmada farklı sonuç veren ifadeler önbelleğe alınmaz
+_UNCACHEABLE_PATTERN = re.compile(
+    r"\b(insert|update|delete|merge|create|alter|drop|truncate|grant|revoke|copy|call|lock|into"
+    r"|nextval|setval|now|random|clock_timestamp|statement_timestamp|current_timestamp|current_date"
+    r"|current_time|localtime|localtimestamp|pg_sleep|txid_current)\b"
+    r"|\bfor\s+(no\s+key\s+)?(update|share)\b"
+)
+
+
+def normalize_sql(sql_query):
+    """Boşlukları sadeleştirir, küçük harfe çevirir, yorumları ve sondaki ';' karakterlerini atar."""
+    literals = []
+
+    def keep_literal(match):
+        literals.append(match.group(0))
+        return f"\x00{len(literals) - 1}\x00"
+
+    # Önce tırnaklı metinleri yer tutucularla değiştir, kalan SQL'i sadeleştir, sonra geri koy
+    code = _SQL_QUOTED_PATTERN.sub(keep_literal, sql_query)
+    code = _SQL_COMMENT_PATTERN.sub(" ", code)
+    code = _WHITESPACE_PATTERN.sub(" ", code).lower().strip().rstrip("; ").strip()
+    return re.sub(r"\x00(\d+)\x00", lambda match: literals[int(match.group(1))], code)
+
+
+def strip_literals(normalized_sql):
+    """Tırnaklı metinleri boşaltır; anahtar kelime ve ';' aramaları metin içeriğine takılmaz."""
+    return _SQL_QUOTED_PATTERN.sub("''", normalized_sql)
+
+
+def is_cacheable(normalized_sql):
+    code = strip_literals(normalized_sql)
+    return bool(_READ_ONLY_PATTERN.match(code)) and not _UNCACHEABLE_PATTERN.search(code)
+
+
+class ResultCache:
+    """
+    Read-only SQL result cache.
+    Key: (connection identity, normalized SQL). Entries expire after ttl seconds and the
+    least recently used ones are evicted when the total size exceeds max_bytes.
+    """
+    def __init__(self, ttl=RESULT_CACHE_TTL, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = RLock()
+        self._hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._evicted = 0
+
+    def make_key(self, connection_key, sql_query):
+        """Önbelleğe alınamayan (SELECT olmayan) sorgular için None döner."""
+        normalized = normalize_sql(sql_query)
+        if not is_cacheable(normalized):
+            with self._lock:
+                self._bypassed += 1
+            return None
+        return (connection_key, normalized)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, size, value = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value, size=None):
+        size = len(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self._evicted += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self, connection_key=None):
+        """Bir bağlantıya ait (ya da tüm) kayıtları siler."""
+        with self._lock:
+            for key in list(self._entries):
+                if connection_key is None or key[0] == connection_key:
+                    self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "bypassed": self._bypassed,
+                "evicted": self._evicted,
+            }
+
+
+result_cache = ResultCache()
@@ -0,0 +1,49 @@
+from contextlib import contextmanager
+from threading import Event, Lock
+
+
+class RunCancelledError(Exception):
+    pass
+
+
+class RunControl:
+    """
+    Cancellation handle shared between an HTTP request and the agent run serving it.
+    When the request is abandoned (client disconnected, timeout) cancel() stops the
+    run at its next step and cancels the SQL statements it is executing on the server.
+    """
+    def __init__(self):
+        self._cancelled = Event()
+        self._connections = set()
+        self._lock = Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise RunCancelledError("Request was abandoned, agent run cancelled")
+
+    @contextmanager
+    def track(self, connection):
+        """Sorgu süresince bağlantıyı kaydeder; cancel() gelirse sunucudaki sorgu iptal edilir."""
+        self.check()
+        with self._lock:
+            self._connections.add(connection)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._connections.discard(connection)
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                # psycopg2 cancel() başka bir thread'den güvenle çağrılabilir
+                connection.cancel()
+            except Exception as e:
+                print(f"Query cancel error: {str(e)}")
@@ -0,0 +1,96 @@
+import os
+import time
+from threading import RLock
+
+# TTL boyunca şema önbellekten doğrudan döner; süre dolunca yalnızca parmak izi sorgusu çalışır
+SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", 60))  # saniye
+
+# Katalog değişikliklerini ucuza yakalamak için parmak izi sorgusu.
+# CREATE/DROP/ALTER TABLE, kolon ekleme/silme/yeniden adlandırma ve tip değişikliği
+# pg_class/pg_attribute satırlarını yeniden yazar; sayı veya xmin değeri değişir.
+# Yorumlar (pg_description) ve foreign key'ler (pg_constraint) ayrıca izlenir.
+SCHEMA_FINGERPRINT_QUERY = """
+SELECT count(DISTINCT c.oid),
+       count(*),
+       coalesce(max(c.xmin::text::bigint), 0),
+       coalesce(max(a.xmin::text::bigint), 0),
+       (SELECT coalesce(max(d.xmin::text::bigint), 0) || ':' || count(*)
+          FROM pg_catalog.pg_description d
+          JOIN pg_catalog.pg_class dc ON dc.oid = d.objoid
+          JOIN pg_catalog.pg_namespace dn ON dn.oid = dc.relnamespace
+         WHERE d.classoid = 'pg_catalog.pg_class'::regclass AND dn.nspname = 'public'),
+       (SELECT coalesce(max(k.xmin::text::bigint), 0) || ':' || count(*)
+          FROM pg_catalog.pg_constraint k
+          JOIN pg_catalog.pg_namespace kn ON kn.oid = k.connamespace
+         WHERE k.contype = 'f' AND kn.nspname = 'public')
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
+WHERE n.nspname = 'public'
+  AND c.relkind IN ('r', 'v', 'm', 'p', 'f')
+  AND a.attnum > 0
+  AND NOT a.attisdropped
+"""
+
+
+class SchemaCache:
+    """
+    Per-connection schema metadata cache.
+    - within the TTL an entry is served from memory without touching the database
+    - after the TTL the catalog fingerprint is compared; if unchanged the entry is
+      renewed, otherwise the full metadata query is run again
+    - invalidate() drops entries explicitly (e.g. when the connection is switched)
+    """
+    def __init__(self, ttl=SCHEMA_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = RLock()
+        self._hits = 0
+        self._revalidations = 0
+        self._misses = 0
+
+    def get(self, key, fetch_fingerprint, load):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now < entry["expires_at"]:
+                self._hits += 1
+                return entry["value"]
+
+        fingerprint = fetch_fingerprint()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["fingerprint"] == fingerprint:
+                entry["expires_at"] = time.monotonic() + self.ttl
+                self._revalidations += 1
+                return entry["value"]
+
+        value = load()
+        with self._lock:
+            self._misses += 1
+            self._entries[key] = {
+                "fingerprint": fingerprint,
+                "expires_at": time.monotonic() + self.ttl,
+                "value": value,
+            }
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "revalidations": self._revalidations,
+                "misses": self._misses,
+                "ttl": self.ttl,
+            }
+
+
+schema_cache = SchemaCache()
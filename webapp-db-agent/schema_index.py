@@ -0,0 +1,337 @@
+import math
+import os
+import re
+from collections import deque
+from threading import Lock, RLock
+
+from observation_format import estimate_tokens, short_type, SCHEMA_TOKEN_BUDGET
+
+# Soruya göre prompt'a girecek en ilgili tablo sayısı ve tablo başına gösterilecek kolon sınırı
+SCHEMA_TOP_K = int(os.getenv("SCHEMA_TOP_K", 8))
+SCHEMA_MAX_COLUMNS = int(os.getenv("SCHEMA_MAX_COLUMNS", 40))
+# İki tablo arasında aranacak en uzun foreign key yolu (kenar sayısı)
+SCHEMA_MAX_JOIN_DEPTH = int(os.getenv("SCHEMA_MAX_JOIN_DEPTH", 3))
+
+# Tablo başına sürüm bilgisi; yalnızca sürümü değişen tabloların detayı yeniden yüklenir.
+# Kolon, yorum (COMMENT ON) ve foreign key değişiklikleri ilgili katalog satırlarının xmin/sayısını değiştirir.
+SCHEMA_TABLE_VERSIONS_QUERY = """
+SELECT c.relname,
+       c.xmin::text::bigint,
+       (SELECT coalesce(max(a.xmin::text::bigint), 0) || ':' || count(*)
+          FROM pg_catalog.pg_attribute a
+         WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped),
+       (SELECT coalesce(max(d.xmin::text::bigint), 0) || ':' || count(*)
+          FROM pg_catalog.pg_description d
+         WHERE d.objoid = c.oid AND d.classoid = 'pg_catalog.pg_class'::regclass),
+       (SELECT coalesce(max(k.xmin::text::bigint), 0) || ':' || count(*)
+          FROM pg_catalog.pg_constraint k
+         WHERE k.conrelid = c.oid AND k.contype = 'f')
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = 'public'
+  AND c.relkind IN ('r', 'v', 'm', 'p', 'f')
+"""
+
+SCHEMA_COLUMNS_QUERY = """
+SELECT c.table_name,
+       c.column_name,
+       c.data_type,
+       col_description(format('%%I.%%I', c.table_schema, c.table_name)::regclass, c.ordinal_position::int),
+       obj_description(format('%%I.%%I', c.table_schema, c.table_name)::regclass, 'pg_class')
+FROM information_schema.columns c
+WHERE c.table_schema = 'public'
+  AND c.table_name = ANY(%s)
+ORDER BY c.table_name, c.ordinal_position
+"""
+
+SCHEMA_FOREIGN_KEYS_QUERY = """
+SELECT src.relname, sa.attname, dst.relname, da.attname
+FROM pg_catalog.pg_constraint k
+JOIN pg_catalog.pg_class src ON src.oid = k.conrelid
+JOIN pg_catalog.pg_namespace n ON n.oid = src.relnamespace
+JOIN pg_catalog.pg_class dst ON dst.oid = k.confrelid
+CROSS JOIN LATERAL unnest(k.conkey, k.confkey) AS cols(src_attnum, dst_attnum)
+JOIN pg_catalog.pg_attribute sa ON sa.attrelid = k.conrelid AND sa.attnum = cols.src_attnum
+JOIN pg_catalog.pg_attribute da ON da.attrelid = k.confrelid AND da.attnum = cols.dst_attnum
+WHERE k.contype = 'f'
+  AND n.nspname = 'public'
+  AND src.relname = ANY(%s)
+ORDER BY src.relname, k.conname
+"""
+
+# BM25 parametreleri ve alan ağırlıkları: tablo adı eşleşmesi kolon/yorum eşleşmesinden güçlüdür
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+_TABLE_NAME_WEIGHT = 3.0
+_COLUMN_NAME_WEIGHT = 1.0
+_COMMENT_WEIGHT = 0.5
+
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+_CAMEL_CASE_PATTERN = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_STOP_WORDS = frozenset(
+    "a an and are as at be by for from how in is it many me much of on or show the to what which who with"
+    " all each per list give get find".split()
+)
+
+
+def _stem(token):
+    """Çoğul ekleri için hafif kök bulma (orders -> order, categories -> category)."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("ses", "xes", "ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Tanımlayıcıları (snake_case, camelCase) ve serbest metni küçük harfli köklere böler."""
+    if not text:
+        return []
+    text = _CAMEL_CASE_PATTERN.sub(" ", text)
+    return [_stem(token) for token in _TOKEN_PATTERN.findall(text.casefold()) if token not in _STOP_WORDS]
+
+
+class _TableInfo:
+    __slots__ = ("name", "comment", "columns", "foreign_keys", "terms", "length")
+
+    def __init__(self, name, comment, columns, foreign_keys):
+        self.name = name
+        self.comment = comment
+        self.columns = columns            # [(column, data_type, comment)]
+        self.foreign_keys = foreign_keys  # [(column, ref_table, ref_column)]
+        self.terms = {}                   # token -> ağırlıklı frekans
+        self.length = 0.0
+        for token in tokenize(name):
+            self._add(token, _TABLE_NAME_WEIGHT)
+        for column, _, column_comment in columns:
+            for token in tokenize(column):
+                self._add(token, _COLUMN_NAME_WEIGHT)
+            for token in tokenize(column_comment):
+                self._add(token, _COMMENT_WEIGHT)
+        for token in tokenize(comment):
+            self._add(token, _COMMENT_WEIGHT)
+
+    def _add(self, token, weight):
+        self.terms[token] = self.terms.get(token, 0.0) + weight
+        self.length += weight
+
+
+class SchemaIndex:
+    """
+    Lexical (BM25) index over the tables of one database.
+    - documents are built from table/column names, table/column comments and foreign keys
+    - search() returns the top-k tables for a question, trimmed to a token budget,
+      together with the foreign key join paths between them
+    - refresh() compares per-table catalog versions and reloads only changed tables
+    """
+    def __init__(self):
+        self._tables = {}      # table -> _TableInfo
+        self._versions = {}    # table -> katalog sürümü
+        self._postings = {}    # token -> {table: ağırlıklı frekans}
+        self._lock = RLock()
+        self._refresh_lock = Lock()
+        self._refreshes = 0
+        self._tables_loaded = 0
+
+    def refresh(self, fetch_versions, load_tables):
+        """
+        fetch_versions() -> {table: version}
+        load_tables(names) -> {table: (comment, columns, foreign_keys)}
+        """
+        with self._refresh_lock:
+            versions = fetch_versions()
+            with self._lock:
+                changed = [name for name, version in versions.items() if self._versions.get(name) != version]
+                removed = [name for name in self._tables if name not in versions]
+            loaded = load_tables(changed) if changed else {}
+            with self._lock:
+                for name in removed + changed:
+                    self._remove(name)
+                    self._versions.pop(name, None)
+                for name, (comment, columns, foreign_keys) in loaded.items():
+                    self._add(_TableInfo(name, comment, columns, foreign_keys))
+                    self._versions[name] = versions[name]
+                self._refreshes += 1
+                self._tables_loaded += len(loaded)
+        return self
+
+    def _add(self, table):
+        self._tables[table.name] = table
+        for token, frequency in table.terms.items():
+            self._postings.setdefault(token, {})[table.name] = frequency
+
+    def _remove(self, name):
+        table = self._tables.pop(name, None)
+        if table is None:
+            return
+        for token in table.terms:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(name, None)
+                if not postings:
+                    del self._postings[token]
+
+    def _score(self, tokens):
+        count = len(self._tables)
+        average_length = sum(table.length for table in self._tables.values()) / count
+        scores = {}
+        for token in set(tokens):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for name, frequency in postings.items():
+                norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * self._tables[name].length / average_length)
+                scores[name] = scores.get(name, 0.0) + idf * frequency * (_BM25_K1 + 1) / (frequency + norm)
+        return scores
+
+    def _neighbours(self, name):
+        table = self._tables.get(name)
+        result = []
+        if table is not None:
+            result.extend((ref_table, (name, column, ref_table, ref_column))
+                          for column, ref_table, ref_column in table.foreign_keys if ref_table in self._tables)
+        result.extend((other.name, (other.name, column, ref_table, ref_column))
+                      for other in self._tables.values()
+                      for column, ref_table, ref_column in other.foreign_keys if ref_table == name)
+        return result
+
+    def _join_path(self, source, target):
+        """İki tablo arasındaki en kısa foreign key yolu (kenar listesi) ya da None."""
+        previous = {source: None}
+        frontier = deque([(source, 0)])
+        while frontier:
+            name, depth = frontier.popleft()
+            if name == target:
+                path = []
+                while previous[name] is not None:
+                    name, edge = previous[name]
+                    path.append(edge)
+                return path[::-1]
+            if depth >= SCHEMA_MAX_JOIN_DEPTH:
+                continue
+            for neighbour, edge in self._neighbours(name):
+                if neighbour not in previous:
+                    previous[neighbour] = (name, edge)
+                    frontier.append((neighbour, depth + 1))
+        return None
+
+    def search(self, question, top_k=SCHEMA_TOP_K, token_budget=SCHEMA_TOKEN_BUDGET):
+        with self._lock:
+            if not self._tables:
+                return "No tables found in schema public."
+
+            if len(self._tables) <= top_k:
+                selected = sorted(self._tables)
+            else:
+                scores = self._score(tokenize(question))
+                if not scores:
+                    return self._list_tables(token_budget)
+                selected = sorted(scores, key=lambda name: (-scores[name], name))[:top_k]
+
+            # Seçilen tabloları birbirine bağlayan yollar; aradaki köprü tablolar da eklenir
+            joins = []
+            for index, source in enumerate(selected):
+                for target in selected[index + 1:]:
+                    path = self._join_path(source, target)
+                    for edge in path or ():
+                        if edge not in joins:
+                            joins.append(edge)
+            bridges = [name for edge in joins for name in (edge[0], edge[2]) if name not in selected]
+            tables = selected + list(dict.fromkeys(bridges))
+            key_columns = {(edge[0], edge[1]) for edge in joins} | {(edge[2], edge[3]) for edge in joins}
+            return self._format(tables, joins, key_columns, question, token_budget)
+
+    def _format(self, names, joins, key_columns, question, token_budget):
+        question_tokens = set(tokenize(question))
+        lines = []
+        used = 0
+        for index, name in enumerate(names):
+            table = self._tables[name]
+            columns = table.columns
+            if len(columns) > SCHEMA_MAX_COLUMNS:
+                # Çok geniş tablolarda önce join ve soruyla eşleşen kolonlar, sonra tablo sırası
+                def priority(item):
+                    position, (column, _, comment) = item
+                    matched = (name, column) in key_columns or question_tokens & set(tokenize(column) + tokenize(comment))
+                    return (0 if matched else 1, position)
+                kept = sorted(sorted(enumerate(columns), key=priority)[:SCHEMA_MAX_COLUMNS])
+                columns = [column for _, column in kept]
+            parts = []
+            for column, data_type, comment in columns:
+                text = f"{column} {short_type(data_type)}"
+                parts.append(f"{text} -- {comment}" if comment else text)
+            if len(columns) < len(table.columns):
+                parts.append(f"... {len(table.columns) - len(columns)} more columns")
+            line = f"{name}({', '.join(parts)})"
+            if table.comment:
+                line += f" -- {table.comment}"
+            cost = estimate_tokens(line) + 1
+            if used + cost > token_budget:
+                lines.append(f"... {len(names) - index} more relevant tables not shown")
+                break
+            lines.append(line)
+            used += cost
+
+        if joins:
+            lines.append("joins:")
+            lines.extend(f"{source}.{column} = {target}.{ref_column}" for source, column, target, ref_column in joins)
+        hidden = len(self._tables) - len(names)
+        if hidden > 0:
+            lines.append(f"{hidden} other tables not shown; call this tool again with other keywords to find them.")
+        return "\n".join(lines)
+
+    def _list_tables(self, token_budget):
+        """Soruyla eşleşen tablo yoksa yalnızca tablo adlarını listeler."""
+        names = sorted(self._tables)
+        lines = ["No table matched the keywords. Tables in schema public:"]
+        used = estimate_tokens(lines[0])
+        for index, name in enumerate(names):
+            cost = estimate_tokens(name) + 1
+            if used + cost > token_budget:
+                lines.append(f"... {len(names) - index} more tables")
+                break
+            lines.append(name)
+            used += cost
+        lines.append("Call this tool again with table names or keywords to get their columns.")
+        return "\n".join(lines)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tables": len(self._tables),
+                "terms": len(self._postings),
+                "refreshes": self._refreshes,
+                "tables_loaded": self._tables_loaded,
+            }
+
+
+class SchemaIndexStore:
+    """Keeps one SchemaIndex per database connection, so switching back only reloads changed tables."""
+    def __init__(self):
+        self._indexes = {}
+        self._lock = RLock()
+
+    def get(self, key):
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = SchemaIndex()
+            return index
+
+    def discard(self, key):
+        with self._lock:
+            self._indexes.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            indexes = list(self._indexes.values())
+        return {
+            "indexes": len(indexes),
+            "tables": sum(index.stats()["tables"] for index in indexes),
+        }
+
+
+schema_indexes = SchemaIndexStore()
@@ -0,0 +1,84 @@
+import json
+import os
+import re
+
+from result_cache import normalize_sql, strip_literals
+
+# Agent'ın ürettiği sorgular için maliyet eşikleri (0 = kontrol yok)
+SQL_MAX_COST = float(os.getenv("SQL_MAX_COST", 10_000_000))
+SQL_MAX_ESTIMATED_ROWS = float(os.getenv("SQL_MAX_ESTIMATED_ROWS", 5_000_000))
+SQL_STATEMENT_TIMEOUT_MS = int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", 15000))
+
+# EXPLAIN uygulanabilen ifadeler ve sunucu tarafı (named) cursor ile çalıştırılabilenler
+EXPLAINABLE_STATEMENTS = ("select", "with", "values", "table", "insert", "update", "delete", "merge")
+CURSOR_STATEMENTS = ("select", "with", "values", "table")
+_LEADING_KEYWORD_PATTERN = re.compile(r"[\s(]*([a-z]+)")
+
+
+class QueryRejectedError(Exception):
+    pass
+
+
+def leading_keyword(sql_query):
+    """Baştaki yorumlar, boşluklar ve parantezler atlanarak ifadenin ilk anahtar kelimesi (küçük harf)."""
+    match = _LEADING_KEYWORD_PATTERN.match(normalize_sql(sql_query))
+    return match.group(1) if match else ""
+
+
+def is_single_statement(sql_query):
+    # Tırnak içi metinler ve yorumlar dışında ';' kalmamalı (sondaki ';' normalize_sql ile atılır)
+    return ";" not in strip_literals(normalize_sql(sql_query))
+
+
+def guard_query(connection, sql_query, max_cost=SQL_MAX_COST, max_rows=SQL_MAX_ESTIMATED_ROWS,
+                timeout_ms=SQL_STATEMENT_TIMEOUT_MS, read_only=False):
+    """
+    Sets statement_timeout (and optionally read-only mode) for the current transaction and
+    checks the planner estimate with EXPLAIN, all in one round trip. Raises QueryRejectedError
+    with a hint the agent can act on when the estimated cost or row count is over budget.
+    """
+    if not is_single_statement(sql_query):
+        raise QueryRejectedError(
+            "Query rejected: only one SQL statement can be run at a time. "
+            "Remove the extra statements (separated by ';') and send each one as a separate query."
+        )
+    statements = []
+    if read_only:
+        # Veriyi değiştiren her ifade (WITH içindeki DML dahil) sunucuda reddedilir
+        statements.append("SET LOCAL transaction_read_only = on")
+    if timeout_ms:
+        # SET LOCAL: havuz bağlantıyı geri aldığında (rollback) varsayılana döner
+        statements.append(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+    explain = leading_keyword(sql_query) in EXPLAINABLE_STATEMENTS and (max_cost or max_rows)
+    if explain:
+        statements.append(f"EXPLAIN (FORMAT JSON) {sql_query}")
+    if not statements:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute("; ".join(statements))
+        if not explain:
+            return None
+        row = cursor.fetchone()
+    plan_json = row[0] if row else None
+
+    if isinstance(plan_json, str):
+        try:
+            plan_json = json.loads(plan_json)
+        except ValueError:
+            plan_json = None
+    # Beklenmeyen çıktı (plan değil) maliyet kontrolü olmadan çalıştırmaya bırakılır
+    if not (isinstance(plan_json, list) and plan_json and isinstance(plan_json[0], dict)
+            and isinstance(plan_json[0].get("Plan"), dict)):
+        return None
+    plan = plan_json[0]["Plan"]
+    cost = plan.get("Total Cost", 0)
+    rows = plan.get("Plan Rows", 0)
+    if (max_cost and cost > max_cost) or (max_rows and rows > max_rows):
+        raise QueryRejectedError(
+            f"Query rejected before execution: estimated cost {cost:,.0f} (limit {max_cost:,.0f}), "
+            f"estimated rows {rows:,} (limit {max_rows:,.0f}). "
+            "Add a LIMIT, a more selective WHERE filter or aggregate the data (COUNT, SUM, GROUP BY), "
+            "and avoid cross joins, then try again."
+        )
+    return {"cost": cost, "rows": rows}
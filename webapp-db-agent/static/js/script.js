@@ -60,7 +60,8 @@ document.addEventListener('DOMContentLoaded', function() {
         showLoading();
         
         try {
-            const response = await fetch('/api/chat', {
+            // Stream the answer with server-sent events
+            const response = await fetch('/api/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -68,16 +69,14 @@ document.addEventListener('DOMContentLoaded', function() {
                 body: JSON.stringify({ message: message }),
             });
             
-            const data = await response.json();
-            
-            // Remove loading indicator
-            removeLoading();
-            
-            if (data.error) {
-                addMessage('Üzgünüm, bir hata oluştu: ' + data.error, 'bot');
-            } else {
-                addMessage(data.response, 'bot');
+            if (!response.ok || !response.body) {
+                const data = await response.json();
+                removeLoading();
+                addMessage('Üzgünüm, bir hata oluştu: ' + (data.error || response.statusText), 'bot');
+                return;
             }
+            
+            await readChatStream(response);
         } catch (error) {
             // Remove loading indicator
             removeLoading();
@@ -86,6 +85,71 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // Function to read /api/chat/stream events and update the chat as they arrive
+    async function readChatStream(response) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let answerHtml = '';
+        let botMessage = null;
+        
+        function renderAnswer(pendingText) {
+            if (!botMessage) {
+                removeLoading();
+                botMessage = document.createElement('div');
+                botMessage.classList.add('message', 'bot');
+                chatMessages.appendChild(botMessage);
+            }
+            botMessage.innerHTML = answerHtml;
+            if (pendingText) {
+                const pendingElement = document.createElement('p');
+                pendingElement.textContent = pendingText;
+                botMessage.appendChild(pendingElement);
+            }
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        }
+        
+        function handleEvent(event, data) {
+            const loadingElement = document.getElementById('loadingIndicator');
+            if (event === 'tool_start' && loadingElement) {
+                loadingElement.title = data.tool;
+            } else if (event === 'sql' && loadingElement) {
+                loadingElement.title = data.query;
+            } else if (event === 'token') {
+                answerHtml += data.html;
+                renderAnswer(data.pending);
+            } else if (event === 'done') {
+                answerHtml = data.response;
+                renderAnswer('');
+            } else if (event === 'error') {
+                removeLoading();
+                addMessage('Üzgünüm, bir hata oluştu: ' + data.error, 'bot');
+            }
+        }
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            // Events are separated by a blank line
+            let separatorIndex;
+            while ((separatorIndex = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, separatorIndex);
+                buffer = buffer.slice(separatorIndex + 2);
+                
+                let event = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                handleEvent(event, data ? JSON.parse(data) : {});
+            }
+        }
+        removeLoading();
+    }
+
     // Function to clear chat
     async function clearChat() {
         try {
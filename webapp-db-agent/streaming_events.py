@@ -0,0 +1,71 @@
+import time
+
+from langchain.callbacks.base import BaseCallbackHandler
+
+
+# Her LLM ve tool adımından önce iptali kontrol eden callback (istek terk edildiyse agent durur)
+class CancellationHandler(BaseCallbackHandler):
+    # İptal (RunCancelledError) agent'a iletilsin; aksi halde LangChain callback hatalarını yutar
+    raise_error = True
+
+    def __init__(self, control=None):
+        self.control = control
+
+    def _check_cancelled(self):
+        if self.control is not None:
+            self.control.check()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._check_cancelled()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.on_llm_start(serialized, [], **kwargs)
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self._check_cancelled()
+
+
+# Agent adımlarını (tool başladı/bitti, SQL, final yanıt token'ları) bir kuyruğa aktaran callback
+class StreamingEventHandler(CancellationHandler):
+    # conversational-react-description agent'ı son yanıtı "AI:" önekiyle yazar
+    FINAL_ANSWER_PREFIX = "AI:"
+
+    def __init__(self, events, control=None):
+        super().__init__(control)
+        self.events = events
+        self._llm_text = ""
+        self._in_final_answer = False
+        self._tools = {}
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._check_cancelled()
+        self._llm_text = ""
+        self._in_final_answer = False
+
+    def on_llm_new_token(self, token, **kwargs):
+        if self._in_final_answer:
+            self.events.put(("token", token))
+            return
+        self._llm_text += token
+        index = self._llm_text.find(self.FINAL_ANSWER_PREFIX)
+        if index != -1:
+            self._in_final_answer = True
+            answer = self._llm_text[index + len(self.FINAL_ANSWER_PREFIX):].lstrip()
+            if answer:
+                self.events.put(("token", answer))
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self._check_cancelled()
+        name = (serialized or {}).get("name", "tool")
+        self._tools[kwargs.get("run_id")] = (name, time.monotonic())
+        self.events.put(("tool_start", {"tool": name, "input": input_str}))
+        if name == "Execute SQL Query":
+            self.events.put(("sql", {"query": input_str}))
+
+    def on_tool_end(self, output, **kwargs):
+        name, started = self._tools.pop(kwargs.get("run_id"), ("tool", time.monotonic()))
+        self.events.put(("tool_end", {"tool": name, "elapsed_ms": round((time.monotonic() - started) * 1000)}))
+
+    def on_tool_error(self, error, **kwargs):
+        name, _ = self._tools.pop(kwargs.get("run_id"), ("tool", None))
+        self.events.put(("tool_error", {"tool": name, "error": str(error)}))
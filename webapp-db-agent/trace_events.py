@@ -0,0 +1,46 @@
+import time
+
+from langchain.callbacks.base import BaseCallbackHandler
+
+from observation_format import estimate_tokens
+
+
+# LLM ve tool çağrılarının süresini ve token sayılarını RequestTrace'e yazan callback
+class TraceCallbackHandler(BaseCallbackHandler):
+    def __init__(self, trace):
+        self.trace = trace
+        self._llm_calls = {}  # run_id -> (başlangıç, tahmini prompt token)
+        self._tools = {}      # run_id -> (tool, başlangıç)
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._llm_calls[kwargs.get("run_id")] = (time.perf_counter(), sum(estimate_tokens(prompt) for prompt in prompts))
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        text = "".join(str(message.content) for batch in messages for message in batch)
+        self._llm_calls[kwargs.get("run_id")] = (time.perf_counter(), estimate_tokens(text))
+
+    def on_llm_end(self, response, **kwargs):
+        started, prompt_tokens = self._llm_calls.pop(kwargs.get("run_id"), (time.perf_counter(), 0))
+        # Streaming yanıtlarda token_usage gelmez; o durumda metin uzunluğundan tahmin edilir
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        completion_tokens = usage.get("completion_tokens")
+        if completion_tokens is None:
+            completion_tokens = sum(estimate_tokens(generation.text)
+                                    for generations in response.generations for generation in generations)
+        self.trace.add_llm_call((time.perf_counter() - started) * 1000,
+                                usage.get("prompt_tokens", prompt_tokens), completion_tokens)
+
+    def on_llm_error(self, error, **kwargs):
+        started, prompt_tokens = self._llm_calls.pop(kwargs.get("run_id"), (time.perf_counter(), 0))
+        self.trace.add_llm_call((time.perf_counter() - started) * 1000, prompt_tokens, 0)
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self._tools[kwargs.get("run_id")] = ((serialized or {}).get("name", "tool"), time.perf_counter())
+
+    def on_tool_end(self, output, **kwargs):
+        tool, started = self._tools.pop(kwargs.get("run_id"), ("tool", time.perf_counter()))
+        self.trace.add_tool_call(tool, (time.perf_counter() - started) * 1000)
+
+    def on_tool_error(self, error, **kwargs):
+        tool, started = self._tools.pop(kwargs.get("run_id"), ("tool", time.perf_counter()))
+        self.trace.add_tool_call(tool, (time.perf_counter() - started) * 1000, error=True)